@@ -1,34 +1,169 @@
-from flask import Flask, render_template, request, redirect, url_for, session, flash, jsonify
+from flask import (Flask, render_template, request, redirect, url_for, session, flash, jsonify, g,
+                   send_from_directory, make_response, abort)
 from functools import wraps
-from datetime import datetime
+from werkzeug.http import is_resource_modified
+import click
+import hashlib
+import hmac
+import json
+import mimetypes
+import time
+from flask.cli import AppGroup
 import os
 import sqlite3
-from werkzeug.utils import secure_filename
 from werkzeug.security import generate_password_hash
 from config import Config
-from models import init_db, get_db_connection, get_user_by_email, check_password, create_user
-from forms import LoginForm, RegistrationForm, ReportForm, ArticleForm, QuizForm, TipAlertForm
+from models import (init_db_pool, init_db, connect, get_db_connection, get_user_by_email, check_password, create_user,
+                    record_quiz_attempt, get_user_best_scores, make_excerpt, get_user_auth,
+                    rehash_password_if_needed, query_observers)
+from view_counter import ViewCounter
+from quiz_cache import QuizCache
+from page_cache import PageCache, parse_timestamp
+from static_assets import ENCODING_SUFFIXES, StaticAssets
+from i18n import LANGUAGE_ENVIRON_KEY, LanguagePrefixMiddleware, prefix_language
+from auth_cache import AuthCache
+from passwords import HasherBusy
+from attachments import store_upload, record_attachment, InvalidAttachment
+from pagination import decode_cursor, split_page
+from search import build_match_query, search_articles, search_tips_alerts
+from jobs import JobWorker, enqueue
+from metrics import Metrics, QueryStats, record_query
+from slow_queries import SlowQueryLog, top_slow_queries
+from content_import import BundleError, import_bundle
+from report_export import EXPORT_FORMATS, parse_timestamp_arg, query_reports, iter_ndjson, iter_csv
+from stats import get_counters, get_counters_with_prefix, recount
+from grading import parse_answers, grade, encode_answers, regrade_quiz_attempts
+from forms import LoginForm, RegistrationForm, ReportForm, ArticleForm, QuizForm, QuestionForm, TipAlertForm
 
 app = Flask(__name__)
 app.config.from_object(Config)
+init_db_pool(app)
 
-@app.before_request
-def set_language_on_first_visit():
-    if 'language' not in session:
-        session['language'] = app.config['DEFAULT_LANGUAGE']
+# /ar/... and /en/... select the language without a cookie
+app.wsgi_app = LanguagePrefixMiddleware(app.wsgi_app, app.config['LANGUAGES'])
 
 # Ensure upload folder exists
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 
-# Initialize database
-if not os.path.exists(app.config['DATABASE']):
-    init_db()
+# Initialize database and apply any pending schema migrations
+init_db()
+
+# Hashed static URLs and their .gz/.br siblings
+static_assets = StaticAssets(app.static_folder, exclude=app.config['STATIC_EXCLUDE']).build()
+
+# Buffered article view counts, flushed in batches per worker
+view_counter = ViewCounter(
+    flush_interval=app.config['VIEW_COUNTER_FLUSH_INTERVAL'],
+    flush_threshold=app.config['VIEW_COUNTER_FLUSH_THRESHOLD'],
+    database=app.config['DATABASE'],
+)
+
+# Compiled quizzes (questions, options and answer key) shared by the quiz routes
+quiz_cache = QuizCache()
+
+# Rendered public pages, validated against content_versions
+page_cache = PageCache(max_bytes=app.config['PAGE_CACHE_MAX_BYTES'], ttl=app.config['PAGE_CACHE_TTL'])
+
+# Cached role/active checks for admin_required
+auth_cache = AuthCache(get_user_auth, ttl=app.config['AUTH_CACHE_TTL'])
+
+# In-process background job threads, started on the first request of each worker
+job_worker = JobWorker(app.config['DATABASE'], threads=app.config['JOBS_WORKER_THREADS'],
+                       poll_interval=app.config['JOBS_POLL_INTERVAL'])
+
+# Request latency and per-request SQL statistics, summed across workers in the database
+metrics = Metrics(flush_interval=app.config['METRICS_FLUSH_INTERVAL'], database=app.config['DATABASE'])
+query_observers.append(record_query)
+
+# Statements slower than SLOW_QUERY_THRESHOLD_MS, with their query plans
+slow_query_log = SlowQueryLog(threshold_ms=app.config['SLOW_QUERY_THRESHOLD_MS'],
+                              flush_interval=app.config['SLOW_QUERY_FLUSH_INTERVAL'],
+                              database=app.config['DATABASE'])
+query_observers.append(slow_query_log.observe)
+
+@app.before_request
+def start_request_metrics():
+    g.request_started = time.perf_counter()
+    g.query_stats = QueryStats()
+
+@app.after_request
+def record_request_metrics(response):
+    started = g.get('request_started')
+    if started is not None:
+        metrics.observe_request(request.endpoint, request.method, response.status_code,
+                                time.perf_counter() - started, g.get('query_stats'))
+    return response
+
+@app.before_request
+def start_job_worker():
+    if app.config['JOBS_WORKER_THREADS'] > 0:
+        job_worker.start()
 
 # --- Helper Functions ---
 
+REPORT_STATUSES = ['new', 'in_review', 'closed']
+
 def get_current_language():
-    """Get the current language from session."""
-    return session.get('language')
+    """Language from the URL prefix, an explicit choice in the session, or Accept-Language.
+    
+    Only the last case depends on a request header the URL does not carry,
+    and add_language_vary() then marks the response accordingly.
+    """
+    lang = request.environ.get(LANGUAGE_ENVIRON_KEY) or (has_session_cookie() and session.get('language'))
+    if lang in app.config['LANGUAGES']:
+        return lang
+    g.language_negotiated = True
+    return request.accept_languages.best_match(app.config['LANGUAGES'], default=app.config['DEFAULT_LANGUAGE'])
+
+def language_root():
+    """script_root without the language prefix."""
+    root = request.script_root
+    if request.environ.get(LANGUAGE_ENVIRON_KEY):
+        root = root.rsplit('/', 1)[0]
+    return root
+
+@app.after_request
+def add_language_vary(response):
+    if g.get('language_negotiated'):
+        response.vary.add('Accept-Language')
+    return response
+
+@app.template_global('url_for')
+def url_for_with_assets(endpoint, **values):
+    """url_for for templates: static files get their hashed, language-independent URL."""
+    if endpoint == 'static' and not values.get('_external'):
+        return f"{language_root()}{app.static_url_path}/{static_assets.url_name(values['filename'])}"
+    return url_for(endpoint, **values)
+
+@app.endpoint('static')
+def static(filename):
+    """Serve hashed assets as immutable, preferring a precompressed sibling."""
+    # Legacy report uploads under static/ are only reachable through download_attachment
+    if static_assets.is_excluded(filename):
+        abort(404)
+    asset = static_assets.resolve(filename)
+    if asset is None:
+        return app.send_static_file(filename)
+    
+    encoding = next((e for e in asset.encodings if e in request.accept_encodings), None)
+    response = send_from_directory(
+        app.static_folder, asset.path + (ENCODING_SUFFIXES[encoding] if encoding else ''),
+        mimetype=mimetypes.guess_type(asset.path)[0], max_age=app.config['STATIC_MAX_AGE']
+    )
+    if encoding:
+        response.content_encoding = encoding
+    if asset.encodings:
+        response.vary.add('Accept-Encoding')
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+@app.context_processor
+def inject_language_url():
+    def language_url(language):
+        """The current page under the /<language> prefix."""
+        return language_root() + prefix_language(request.full_path, language, app.config['LANGUAGES'])
+    return dict(language_url=language_url)
 
 def translate_report_types():
     """Get report types for the current language."""
@@ -53,17 +188,106 @@ def admin_required(f):
             flash('يجب تسجيل الدخول أولاً.', 'warning')
             return redirect(url_for('login'))
         
-        conn = get_db_connection()
-        user = conn.execute("SELECT role FROM users WHERE id = ?", (session['user_id'],)).fetchone()
-        conn.close()
+        # Sessions from before auth_version existed adopt the current value once
+        if 'auth_version' not in session:
+            user = get_user_auth(session['user_id'])
+            session['auth_version'] = user['auth_version'] if user else None
+        
+        user = auth_cache.get(session['user_id'], session['auth_version'])
+        if not user or not user.is_active:
+            session.clear()
+            flash('يجب تسجيل الدخول أولاً.', 'warning')
+            return redirect(url_for('login'))
         
-        if not user or user['role'] != 'admin':
+        if user.role != 'admin':
             flash('لا توجد صلاحيات كافية.', 'danger')
             return redirect(url_for('index'))
         
         return f(*args, **kwargs)
     return decorated_function
 
+def has_session_cookie():
+    """True if the request carries a session cookie.
+    
+    Reading the session marks the response `Vary: Cookie`, which keeps shared
+    caches from storing anonymous pages; requests without the cookie have an
+    empty session anyway, so they skip it.
+    """
+    return app.config['SESSION_COOKIE_NAME'] in request.cookies
+
+def get_viewer():
+    """Role the page is rendered for; the navbar differs for guests, users and admins."""
+    if not has_session_cookie():
+        return None
+    return session.get('user_role') if 'user_id' in session else None
+
+@app.context_processor
+def inject_viewer():
+    return dict(viewer=get_viewer())
+
+def _render_fingerprint():
+    digest = hashlib.blake2b(digest_size=8)
+    for name in sorted(app.jinja_env.list_templates()):
+        with open(os.path.join(app.root_path, app.template_folder, name), 'rb') as f:
+            digest.update(name.encode() + f.read())
+    for name in sorted(static_assets.url_name(path) for path in static_assets.paths()):
+        digest.update(name.encode())
+    return digest.hexdigest()
+
+# Part of every ETag, so deploying changed templates or assets invalidates browser caches
+RENDER_FINGERPRINT = _render_fingerprint()
+
+def page_etag(*parts):
+    return hashlib.blake2b(repr((RENDER_FINGERPRINT,) + parts).encode(), digest_size=12).hexdigest()
+
+def set_validators(response, etag, last_modified):
+    """Attach validators and make clients revalidate before reusing the page."""
+    response.set_etag(etag)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    response.cache_control.no_cache = True
+    return response
+
+def not_modified(etag, last_modified):
+    """A 304 response if the request's If-None-Match/If-Modified-Since match, else None."""
+    if is_resource_modified(request.environ, etag=etag, last_modified=last_modified):
+        return None
+    return set_validators(app.response_class(status=304), etag, last_modified)
+
+def cached_page(*sections):
+    """Decorator serving a public page from page_cache.
+    
+    Pages are keyed by script root (links differ under a language prefix),
+    endpoint, arguments, language and viewer and depend on the content
+    versions of `sections`, which also provide the ETag and Last-Modified
+    validators. Requests with pending flash messages bypass the cache and
+    get no validators.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            if has_session_cookie() and '_flashes' in session:
+                return f(*args, **kwargs)
+            
+            key = (request.script_root, request.endpoint, tuple(sorted(kwargs.items())),
+                   tuple(sorted(request.args.items(multi=True))), get_current_language(), get_viewer())
+            state = page_cache.content_state(get_db_connection(), sections)
+            etag = page_etag(key, state.versions)
+            response = not_modified(etag, state.last_modified)
+            if response is not None:
+                return response
+            
+            body = page_cache.get(key, state.versions)
+            if body is None:
+                rendered = f(*args, **kwargs)
+                if not isinstance(rendered, str):
+                    return rendered
+                body = rendered.encode('utf-8')
+                page_cache.put(key, state.versions, body)
+            return set_validators(app.response_class(body, mimetype='text/html'), etag, state.last_modified)
+        return decorated_function
+    return decorator
+
 # --- Routes: Authentication ---
 
 @app.route('/login', methods=['GET', 'POST'])
@@ -73,10 +297,23 @@ def login():
         password = request.form.get('password')
         
         user = get_user_by_email(email)
-        if user and check_password(user, password):
+        try:
+            valid = bool(user) and check_password(user, password)
+        except HasherBusy:
+            flash('الخادم مشغول حالياً، يرجى المحاولة بعد قليل.', 'warning')
+            return render_template('login.html', lang=get_current_language()), 503
+        
+        if valid:
+            # The upgrade is optional: retry it on a later login rather than refuse this one
+            try:
+                rehash_password_if_needed(user, password)
+            except HasherBusy:
+                app.logger.warning("Skipped password rehash for user %s: hasher busy", user['id'])
+            
             session['user_id'] = user['id']
             session['user_email'] = user['email']
             session['user_role'] = user['role']
+            session['auth_version'] = user['auth_version']
             flash('تم تسجيل الدخول بنجاح.', 'success')
             return redirect(url_for('index'))
         else:
@@ -100,10 +337,15 @@ def register():
             flash('كلمتا المرور غير متطابقتان.', 'danger')
         elif len(password) < 8:
             flash('كلمة المرور يجب أن تكون 8 أحرف على الأقل.', 'danger')
-        elif create_user(full_name, email, password, department, job_role):
-            flash('تم إنشاء الحساب بنجاح. يمكنك الآن تسجيل الدخول.', 'success')
-            return redirect(url_for('login'))
         else:
+            try:
+                created = create_user(full_name, email, password, department, job_role)
+            except HasherBusy:
+                flash('الخادم مشغول حالياً، يرجى المحاولة بعد قليل.', 'warning')
+                return render_template('register.html', lang=lang), 503
+            if created:
+                flash('تم إنشاء الحساب بنجاح. يمكنك الآن تسجيل الدخول.', 'success')
+                return redirect(url_for('login'))
             flash('البريد الإلكتروني موجود بالفعل.', 'danger')
     
     lang = get_current_language()
@@ -111,6 +353,8 @@ def register():
 
 @app.route('/logout')
 def logout():
+    if 'user_id' in session:
+        auth_cache.invalidate(session['user_id'])
     session.clear()
     flash('تم تسجيل الخروج بنجاح.', 'success')
     return redirect(url_for('index'))
@@ -119,27 +363,45 @@ def logout():
 
 @app.route('/set-language/<language>')
 def set_language(language):
-    if language in app.config['LANGUAGES']:
-        session['language'] = language
-    return redirect(request.referrer or url_for('index'))
+    if language not in app.config['LANGUAGES']:
+        return redirect(request.referrer or url_for('index'))
+    # An explicit choice is remembered for later unprefixed visits
+    session['language'] = language
+    return redirect(language_root() + prefix_language(request.referrer, language, app.config['LANGUAGES']))
 
 # --- Routes: Public Pages ---
 
 @app.route('/')
+@cached_page()
 def index():
     lang = get_current_language()
     return render_template('index.html', lang=lang)
 
 @app.route('/articles')
+@cached_page('articles')
 def articles():
     conn = get_db_connection()
     lang = get_current_language()
+    page_size = app.config['ARTICLES_PER_PAGE']
     
-    # Get articles for the current language
-    articles_list = conn.execute("SELECT * FROM articles WHERE is_published = 1").fetchall()
+    # Keyset pagination on (created_at, id); full bodies are never loaded here
+    query = """SELECT id, title_ar, title_en, excerpt_ar, excerpt_en, views, created_at
+               FROM articles WHERE is_published = 1"""
+    params = []
+    cursor = decode_cursor(request.args.get('cursor'), 2)
+    if cursor:
+        query += " AND (created_at, id) < (?, ?)"
+        params.extend(cursor)
+    query += " ORDER BY created_at DESC, id DESC LIMIT ?"
+    params.append(page_size + 1)
+    
+    rows = conn.execute(query, params).fetchall()
     conn.close()
     
-    return render_template('articles.html', articles=articles_list, lang=lang)
+    articles_list, next_cursor = split_page(rows, page_size, lambda a: (a['created_at'], a['id']))
+    
+    return render_template('articles.html', articles=articles_list, next_cursor=next_cursor,
+                           is_first_page=cursor is None, lang=lang)
 
 @app.route('/article/<int:article_id>')
 def article_detail(article_id):
@@ -152,12 +414,22 @@ def article_detail(article_id):
         flash('المقالة غير موجودة.', 'danger')
         return redirect(url_for('articles'))
     
-    # Increment views
-    conn.execute("UPDATE articles SET views = views + 1 WHERE id = ?", (article_id,))
-    conn.commit()
     conn.close()
     
-    return render_template('article_detail.html', article=article, lang=lang)
+    # Increment views (buffered, written in batches); revalidated visits count too
+    view_counter.increment(article_id)
+    
+    if '_flashes' in session:
+        return render_template('article_detail.html', article=article, lang=lang)
+    
+    etag = page_etag('article', article_id, article['updated_at'], lang, get_viewer())
+    last_modified = parse_timestamp(article['updated_at'])
+    response = not_modified(etag, last_modified)
+    if response is not None:
+        return response
+    
+    response = make_response(render_template('article_detail.html', article=article, lang=lang))
+    return set_validators(response, etag, last_modified)
 
 @app.route('/quizzes')
 def quizzes():
@@ -166,20 +438,16 @@ def quizzes():
     
     quizzes_list = conn.execute("SELECT * FROM quizzes").fetchall()
     
-    # For each quiz, get user's best score if logged in
-    user_scores = {}
+    # Get all of the user's best scores in one query if logged in
+    user_best = {}
     if 'user_id' in session:
-        for quiz in quizzes_list:
-            result = conn.execute(
-                "SELECT MAX(score) as best_score FROM user_quiz_results WHERE user_id = ? AND quiz_id = ?",
-                (session['user_id'], quiz['id'])
-            ).fetchone()
-            if result and result['best_score']:
-                user_scores[quiz['id']] = result['best_score']
+        user_best = get_user_best_scores(conn, session['user_id'])
+    user_scores = {quiz_id: row['best_score'] for quiz_id, row in user_best.items()}
     
     conn.close()
     
-    return render_template('quizzes.html', quizzes=quizzes_list, user_scores=user_scores, lang=lang)
+    return render_template('quizzes.html', quizzes=quizzes_list, user_scores=user_scores,
+                           user_best=user_best, lang=lang)
 
 @app.route('/quiz/<int:quiz_id>')
 def take_quiz(quiz_id):
@@ -190,61 +458,30 @@ def take_quiz(quiz_id):
     conn = get_db_connection()
     lang = get_current_language()
     
-    quiz = conn.execute("SELECT * FROM quizzes WHERE id = ?", (quiz_id,)).fetchone()
-    if not quiz:
+    compiled = quiz_cache.get(conn, quiz_id)
+    conn.close()
+    
+    if not compiled:
         flash('الاختبار غير موجود.', 'danger')
         return redirect(url_for('quizzes'))
     
-    questions = conn.execute(
-        "SELECT * FROM quiz_questions WHERE quiz_id = ?",
-        (quiz_id,)
-    ).fetchall()
-    
-    # Get options for each question
-    quiz_data = []
-    for q in questions:
-        options = conn.execute(
-            "SELECT * FROM quiz_options WHERE question_id = ?",
-            (q['id'],)
-        ).fetchall()
-        quiz_data.append({
-            'question': q,
-            'options': options
-        })
-    
-    conn.close()
-    
-    return render_template('take_quiz.html', quiz=quiz, quiz_data=quiz_data, lang=lang)
+    return render_template('take_quiz.html', quiz=compiled.quiz, quiz_data=compiled.items, lang=lang)
 
 @app.route('/submit-quiz/<int:quiz_id>', methods=['POST'])
 @login_required
 def submit_quiz(quiz_id):
     conn = get_db_connection()
     
-    quiz = conn.execute("SELECT * FROM quizzes WHERE id = ?", (quiz_id,)).fetchone()
-    if not quiz:
+    compiled = quiz_cache.get(conn, quiz_id)
+    if not compiled:
         return jsonify({'error': 'Quiz not found'}), 404
     
-    questions = conn.execute(
-        "SELECT * FROM quiz_questions WHERE quiz_id = ?",
-        (quiz_id,)
-    ).fetchall()
-    
-    score = 0
-    total = len(questions)
-    
-    for q in questions:
-        user_answer = request.form.get(f'question_{q["id"]}')
-        if user_answer and int(user_answer) == q['correct_option']:
-            score += 1
-    
-    percentage = int((score / total) * 100) if total > 0 else 0
+    answers = parse_answers(request.form, compiled.question_ids)
+    percentage = grade(compiled.answer_key, answers).percentage
     
     # Save result
-    conn.execute(
-        "INSERT INTO user_quiz_results (user_id, quiz_id, score) VALUES (?, ?, ?)",
-        (session['user_id'], quiz_id, percentage)
-    )
+    record_quiz_attempt(conn, session['user_id'], quiz_id, percentage,
+                        encode_answers(compiled.question_ids, answers))
     conn.commit()
     conn.close()
     
@@ -266,6 +503,7 @@ def quiz_result(quiz_id):
     return render_template('quiz_result.html', quiz=quiz, score=score, passed=passed, lang=lang)
 
 @app.route('/tips')
+@cached_page('tips_alerts')
 def tips():
     conn = get_db_connection()
     lang = get_current_language()
@@ -276,6 +514,7 @@ def tips():
     return render_template('tips.html', tips=tips_list, lang=lang)
 
 @app.route('/alerts')
+@cached_page('tips_alerts')
 def alerts():
     conn = get_db_connection()
     lang = get_current_language()
@@ -285,6 +524,24 @@ def alerts():
     
     return render_template('alerts.html', alerts=alerts_list, lang=lang)
 
+@app.route('/search')
+def search():
+    lang = get_current_language()
+    query = request.args.get('q', '').strip()
+    
+    articles_results = []
+    tips_results = []
+    match_query = build_match_query(query)
+    if match_query:
+        conn = get_db_connection()
+        limit = app.config['SEARCH_RESULTS_LIMIT']
+        articles_results = search_articles(conn, match_query, limit)
+        tips_results = search_tips_alerts(conn, match_query, limit)
+        conn.close()
+    
+    return render_template('search.html', query=query, articles=articles_results,
+                           tips_alerts=tips_results, lang=lang)
+
 # --- Routes: Vulnerability Reporting ---
 
 @app.route('/report', methods=['GET', 'POST'])
@@ -295,23 +552,29 @@ def submit_report():
         title = request.form.get('title')
         description = request.form.get('description')
         
-        file_path = None
+        attachment = None
         if 'file_upload' in request.files:
             file = request.files['file_upload']
             if file and file.filename:
-                # Validate file
-                allowed_extensions = {'jpg', 'jpeg', 'png', 'pdf'}
-                if '.' in file.filename and file.filename.rsplit('.', 1)[1].lower() in allowed_extensions:
-                    filename = secure_filename(file.filename)
-                    # Add timestamp to ensure uniqueness
-                    filename = f"{datetime.now().timestamp()}_{filename}"
-                    file.save(os.path.join(app.config['UPLOAD_FOLDER'], filename))
-                    file_path = f"uploads/{filename}"
+                # Stream to content-addressed storage; the type is sniffed from the content
+                try:
+                    attachment = store_upload(file.stream, app.config['UPLOAD_FOLDER'],
+                                              app.config['ATTACHMENT_CHUNK_SIZE'])
+                except InvalidAttachment:
+                    flash('لم يتم حفظ الملف المرفق. الأنواع المسموح بها: jpg, png, pdf.', 'warning')
         
         conn = get_db_connection()
+        file_path = None
+        if attachment:
+            if record_attachment(conn, attachment):
+                # Scanned after the response; committed together with the report
+                enqueue(conn, 'attachment.scan',
+                        {'sha256': attachment.sha256, 'upload_folder': app.config['UPLOAD_FOLDER']})
+            file_path = attachment.file_path
         conn.execute(
-            "INSERT INTO reports (user_id, report_type, title, description, file_path, status) VALUES (?, ?, ?, ?, ?, ?)",
-            (session['user_id'], report_type, title, description, file_path, 'new')
+            "INSERT INTO reports (user_id, report_type, title, description, file_path, attachment_sha256, status) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (session['user_id'], report_type, title, description, file_path,
+             attachment.sha256 if attachment else None, 'new')
         )
         conn.commit()
         conn.close()
@@ -360,6 +623,67 @@ def report_detail(report_id):
     
     return render_template('report_detail.html', report=report, lang=lang)
 
+@app.route('/report/<int:report_id>/attachment')
+@login_required
+def download_attachment(report_id):
+    conn = get_db_connection()
+    report = conn.execute(
+        """SELECT r.id, r.user_id, r.file_path, r.attachment_sha256, a.file_path AS stored_path, a.mime_type,
+                  a.scan_status
+           FROM reports r LEFT JOIN attachments a ON a.sha256 = r.attachment_sha256
+           WHERE r.id = ?""",
+        (report_id,)
+    ).fetchone()
+    conn.close()
+    
+    if not report or not report['file_path']:
+        flash('الملف غير موجود.', 'danger')
+        return redirect(url_for('my_reports'))
+    
+    # Same ownership rule as report_detail
+    if session['user_id'] != report['user_id'] and session.get('user_role') != 'admin':
+        flash('لا توجد صلاحيات كافية.', 'danger')
+        return redirect(url_for('my_reports'))
+    
+    # Files that failed the background scan (attachment.scan job) are never served
+    if report['scan_status'] == 'rejected':
+        flash('تم حظر هذا الملف لأنه لم يجتز الفحص.', 'danger')
+        return redirect(url_for('my_reports'))
+    
+    if not report['attachment_sha256']:
+        # Uploaded before content-addressed storage: still lives under static/
+        response = send_from_directory(app.static_folder, report['file_path'], as_attachment=True,
+                                       max_age=app.config['ATTACHMENT_MAX_AGE'])
+        response.cache_control.public = False
+        response.cache_control.private = True
+        return response
+    
+    extension = report['stored_path'].rsplit('.', 1)[-1]
+    download_name = f"report-{report_id}.{extension}"
+    
+    accel_prefix = app.config['ATTACHMENT_ACCEL_REDIRECT']
+    if accel_prefix:
+        # nginx serves the bytes (sendfile, Range, conditional requests)
+        response = make_response('')
+        response.headers['X-Accel-Redirect'] = accel_prefix.rstrip('/') + '/' + report['stored_path']
+        response.headers['Content-Type'] = report['mime_type']
+        response.headers['Content-Disposition'] = f'attachment; filename="{download_name}"'
+        response.set_etag(report['attachment_sha256'])
+        response.cache_control.private = True
+        response.cache_control.max_age = app.config['ATTACHMENT_MAX_AGE']
+        return response
+    
+    # send_file handles Range and If-None-Match/If-Modified-Since, and uses the
+    # server's file wrapper (sendfile under gunicorn) for the body
+    response = send_from_directory(
+        os.path.abspath(app.config['UPLOAD_FOLDER']), report['stored_path'],
+        mimetype=report['mime_type'], as_attachment=True, download_name=download_name,
+        etag=report['attachment_sha256'], max_age=app.config['ATTACHMENT_MAX_AGE'],
+    )
+    response.cache_control.public = False
+    response.cache_control.private = True
+    return response
+
 # --- Routes: Admin Dashboard ---
 
 @app.route('/admin')
@@ -368,23 +692,42 @@ def admin_dashboard():
     conn = get_db_connection()
     lang = get_current_language()
     
-    # Get statistics
-    total_reports = conn.execute("SELECT COUNT(*) as count FROM reports").fetchone()['count']
-    new_reports = conn.execute("SELECT COUNT(*) as count FROM reports WHERE status = 'new'").fetchone()['count']
-    total_users = conn.execute("SELECT COUNT(*) as count FROM users WHERE role = 'user'").fetchone()['count']
-    total_articles = conn.execute("SELECT COUNT(*) as count FROM articles").fetchone()['count']
-    total_quizzes = conn.execute("SELECT COUNT(*) as count FROM quizzes").fetchone()['count']
+    # Get statistics (maintained by triggers, see stats.py)
+    counters = get_counters(conn, ['reports', 'reports.status.new', 'users.role.user', 'articles', 'quizzes'])
     
     conn.close()
     
     return render_template('admin_dashboard.html', 
-                         total_reports=total_reports,
-                         new_reports=new_reports,
-                         total_users=total_users,
-                         total_articles=total_articles,
-                         total_quizzes=total_quizzes,
+                         total_reports=counters['reports'],
+                         new_reports=counters['reports.status.new'],
+                         total_users=counters['users.role.user'],
+                         total_articles=counters['articles'],
+                         total_quizzes=counters['quizzes'],
+                         page_cache_stats=page_cache.stats(),
                          lang=lang)
 
+@app.route('/metrics')
+def prometheus_metrics():
+    """Prometheus scrape target for admins, or for scrapers sending `Bearer <METRICS_TOKEN>`."""
+    token = app.config['METRICS_TOKEN']
+    if not (token and hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}')):
+        return admin_required(render_metrics)()
+    return render_metrics()
+
+def render_metrics():
+    return app.response_class(metrics.render(get_db_connection()), mimetype='text/plain; version=0.0.4')
+
+@app.route('/admin/slow-queries')
+@admin_required
+def admin_slow_queries():
+    slow_query_log.flush()
+    conn = get_db_connection()
+    limit = max(1, min(request.args.get('limit', 50, type=int), 500))
+    queries = top_slow_queries(conn, limit)
+    conn.close()
+    return render_template('admin_slow_queries.html', queries=queries,
+                           threshold_ms=app.config['SLOW_QUERY_THRESHOLD_MS'], lang=get_current_language())
+
 @app.route('/admin/reports')
 @admin_required
 def admin_reports():
@@ -394,24 +737,89 @@ def admin_reports():
     # Get filter parameters
     status_filter = request.args.get('status', '')
     type_filter = request.args.get('type', '')
-    
-    query = "SELECT r.*, u.email FROM reports r JOIN users u ON r.user_id = u.id WHERE 1=1"
+    per_page = request.args.get('per_page', app.config['REPORTS_PER_PAGE'], type=int)
+    per_page = max(1, min(per_page, app.config['REPORTS_MAX_PER_PAGE']))
+    cursor = decode_cursor(request.args.get('cursor'), 2)
+    
+    # The page's ids are picked from the filter indexes alone (status, report_type,
+    # created_at and the implicit rowid cover the subquery); only those rows are
+    # then read from reports and users.
+    page_query = "SELECT id, created_at FROM reports WHERE 1=1"
     params = []
     
     if status_filter:
-        query += " AND r.status = ?"
+        page_query += " AND status = ?"
         params.append(status_filter)
     
     if type_filter:
-        query += " AND r.report_type = ?"
+        page_query += " AND report_type = ?"
         params.append(type_filter)
     
-    query += " ORDER BY r.created_at DESC"
+    if cursor:
+        page_query += " AND (created_at, id) < (?, ?)"
+        params.extend(cursor)
     
-    reports = conn.execute(query, params).fetchall()
+    page_query += " ORDER BY created_at DESC, id DESC LIMIT ?"
+    params.append(per_page + 1)
+    
+    rows = conn.execute(
+        f"""SELECT r.id, r.title, r.report_type, r.status, r.created_at, u.email
+            FROM ({page_query}) AS page
+            JOIN reports r ON r.id = page.id JOIN users u ON u.id = r.user_id
+            ORDER BY page.created_at DESC, page.id DESC""",
+        params
+    ).fetchall()
+    reports, next_cursor = split_page(rows, per_page, lambda r: (r['created_at'], r['id']))
+    
+    # Facet counts: each one honours the other active filter
+    status_counts = {status: 0 for status in REPORT_STATUSES}
+    type_counts = {report_type: 0 for report_type, _ in app.config['REPORT_TYPES']['ar']}
+    for key, count in get_counters_with_prefix(conn, 'reports.status_type.').items():
+        status, report_type = key.split('|', 1)
+        if not type_filter or report_type == type_filter:
+            status_counts[status] = status_counts.get(status, 0) + count
+        if not status_filter or status == status_filter:
+            type_counts[report_type] = type_counts.get(report_type, 0) + count
     conn.close()
     
-    return render_template('admin_reports.html', reports=reports, lang=lang)
+    return render_template('admin_reports.html', reports=reports, next_cursor=next_cursor,
+                           is_first_page=cursor is None, status_filter=status_filter,
+                           type_filter=type_filter, per_page=per_page,
+                           status_counts=status_counts, type_counts=type_counts, lang=lang)
+
+@app.route('/admin/reports/export')
+@admin_required
+def admin_export_reports():
+    """Stream matching reports as NDJSON or CSV, resumable with after_id."""
+    export_format = request.args.get('format', 'ndjson')
+    if export_format not in EXPORT_FORMATS:
+        abort(400)
+    try:
+        since = parse_timestamp_arg(request.args.get('since'))
+        until = parse_timestamp_arg(request.args.get('until'))
+    except ValueError:
+        abort(400)
+    after_id = request.args.get('after_id', 0, type=int)
+    status_filter = request.args.get('status', '')
+    type_filter = request.args.get('type', '')
+    encode = iter_ndjson if export_format == 'ndjson' else iter_csv
+    
+    def generate():
+        # Own connection: the pooled one is released when the view returns,
+        # long before the last row is sent
+        conn = connect(app.config['DATABASE'])
+        try:
+            rows = query_reports(conn, status_filter, type_filter, since, until, after_id)
+            yield from encode(rows)
+        finally:
+            conn.close()
+    
+    response = app.response_class(generate(), mimetype=EXPORT_FORMATS[export_format])
+    filename = f"reports-{time.strftime('%Y%m%d-%H%M%S')}.{export_format}"
+    response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+    response.headers['X-Accel-Buffering'] = 'no'
+    response.cache_control.no_store = True
+    return response
 
 @app.route('/admin/report/<int:report_id>')
 @admin_required
@@ -420,7 +828,10 @@ def admin_report_detail(report_id):
     lang = get_current_language()
     
     report = conn.execute(
-        "SELECT r.*, u.email, u.full_name FROM reports r JOIN users u ON r.user_id = u.id WHERE r.id = ?",
+        """SELECT r.*, u.email, u.full_name, a.scan_status
+           FROM reports r JOIN users u ON r.user_id = u.id
+           LEFT JOIN attachments a ON a.sha256 = r.attachment_sha256
+           WHERE r.id = ?""",
         (report_id,)
     ).fetchone()
     
@@ -437,7 +848,7 @@ def admin_report_detail(report_id):
 def update_report_status(report_id):
     new_status = request.form.get('status')
     
-    if new_status not in ['new', 'in_review', 'closed']:
+    if new_status not in REPORT_STATUSES:
         flash('حالة غير صحيحة.', 'danger')
         return redirect(url_for('admin_report_detail', report_id=report_id))
     
@@ -473,9 +884,10 @@ def admin_new_article():
         
         conn = get_db_connection()
         conn.execute(
-            "INSERT INTO articles (title_ar, title_en, content_ar, content_en) VALUES (?, ?, ?, ?)",
-            (title_ar, title_en, content_ar, content_en)
+            "INSERT INTO articles (title_ar, title_en, content_ar, content_en, excerpt_ar, excerpt_en) VALUES (?, ?, ?, ?, ?, ?)",
+            (title_ar, title_en, content_ar, content_en, make_excerpt(content_ar), make_excerpt(content_en))
         )
+        page_cache.invalidate(conn, 'articles')
         conn.commit()
         conn.close()
         
@@ -502,9 +914,10 @@ def admin_edit_article(article_id):
         content_en = request.form.get('content_en')
         
         conn.execute(
-            "UPDATE articles SET title_ar = ?, title_en = ?, content_ar = ?, content_en = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?",
-            (title_ar, title_en, content_ar, content_en, article_id)
+            "UPDATE articles SET title_ar = ?, title_en = ?, content_ar = ?, content_en = ?, excerpt_ar = ?, excerpt_en = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?",
+            (title_ar, title_en, content_ar, content_en, make_excerpt(content_ar), make_excerpt(content_en), article_id)
         )
+        page_cache.invalidate(conn, 'articles')
         conn.commit()
         conn.close()
         
@@ -519,6 +932,7 @@ def admin_edit_article(article_id):
 def admin_delete_article(article_id):
     conn = get_db_connection()
     conn.execute("DELETE FROM articles WHERE id = ?", (article_id,))
+    page_cache.invalidate(conn, 'articles')
     conn.commit()
     conn.close()
     flash('تم حذف المقالة بنجاح.', 'success')
@@ -571,6 +985,7 @@ def admin_edit_quiz(quiz_id):
             "UPDATE quizzes SET title_ar = ?, title_en = ?, pass_score = ? WHERE id = ?",
             (form.title_ar.data, form.title_en.data, form.pass_score.data, quiz_id)
         )
+        quiz_cache.invalidate(conn, quiz_id)
         conn.commit()
         conn.close()
         flash('تم تحديث الاختبار بنجاح.', 'success')
@@ -588,6 +1003,7 @@ def admin_delete_quiz(quiz_id):
     conn.execute("DELETE FROM quiz_options WHERE question_id IN (SELECT id FROM quiz_questions WHERE quiz_id = ?)", (quiz_id,))
     conn.execute("DELETE FROM quiz_questions WHERE quiz_id = ?", (quiz_id,))
     conn.execute("DELETE FROM quizzes WHERE id = ?", (quiz_id,))
+    quiz_cache.invalidate(conn, quiz_id)
     conn.commit()
     conn.close()
     flash('تم حذف الاختبار بنجاح.', 'success')
@@ -597,17 +1013,15 @@ def admin_delete_quiz(quiz_id):
 @admin_required
 def admin_quiz_questions(quiz_id):
     conn = get_db_connection()
-    quiz = conn.execute("SELECT * FROM quizzes WHERE id = ?", (quiz_id,)).fetchone()
-    questions = conn.execute("SELECT * FROM quiz_questions WHERE quiz_id = ?", (quiz_id,)).fetchall()
-    
-    questions_data = []
-    for q in questions:
-        options = conn.execute("SELECT * FROM quiz_options WHERE question_id = ?", (q['id'],)).fetchall()
-        questions_data.append({'question': q, 'options': options})
-        
+    compiled = quiz_cache.get(conn, quiz_id)
     conn.close()
+    
+    if not compiled:
+        flash('الاختبار غير موجود.', 'danger')
+        return redirect(url_for('admin_quizzes'))
+    
     lang = get_current_language()
-    return render_template('admin_quiz_questions.html', quiz=quiz, questions_data=questions_data, lang=lang)
+    return render_template('admin_quiz_questions.html', quiz=compiled.quiz, questions_data=compiled.items, lang=lang)
 
 @app.route('/admin/quiz/<int:quiz_id>/question/new', methods=['GET', 'POST'])
 @admin_required
@@ -640,6 +1054,7 @@ def admin_new_question(quiz_id):
                     (question_id, ar, en)
                 )
         
+        quiz_cache.invalidate(conn, quiz_id)
         conn.commit()
         conn.close()
         flash('تم إنشاء السؤال بنجاح.', 'success')
@@ -681,6 +1096,10 @@ def admin_edit_question(quiz_id, question_id):
             (form.question_ar.data, form.question_en.data, form.correct_option.data, question_id)
         )
         
+        # A changed answer key re-grades past attempts in the background
+        if form.correct_option.data != question['correct_option']:
+            enqueue(conn, 'quiz.regrade', {'quiz_id': quiz_id})
+        
         # Update options (simple approach: delete and re-insert)
         conn.execute("DELETE FROM quiz_options WHERE question_id = ?", (question_id,))
         
@@ -694,6 +1113,7 @@ def admin_edit_question(quiz_id, question_id):
                     (question_id, ar, en)
                 )
         
+        quiz_cache.invalidate(conn, quiz_id)
         conn.commit()
         conn.close()
         flash('تم تحديث السؤال بنجاح.', 'success')
@@ -709,6 +1129,7 @@ def admin_delete_question(quiz_id, question_id):
     conn = get_db_connection()
     conn.execute("DELETE FROM quiz_options WHERE question_id = ?", (question_id,))
     conn.execute("DELETE FROM quiz_questions WHERE id = ?", (question_id,))
+    quiz_cache.invalidate(conn, quiz_id)
     conn.commit()
     conn.close()
     flash('تم حذف السؤال بنجاح.', 'success')
@@ -739,6 +1160,7 @@ def admin_new_tip_alert():
             "INSERT INTO tips_alerts (type, content_ar, content_en) VALUES (?, ?, ?)",
             (form.type.data, form.content_ar.data, form.content_en.data)
         )
+        page_cache.invalidate(conn, 'tips_alerts')
         conn.commit()
         conn.close()
         flash('تم إنشاء النصيحة/التنبيه بنجاح.', 'success')
@@ -765,6 +1187,7 @@ def admin_edit_tip_alert(item_id):
             "UPDATE tips_alerts SET type = ?, content_ar = ?, content_en = ? WHERE id = ?",
             (form.type.data, form.content_ar.data, form.content_en.data, item_id)
         )
+        page_cache.invalidate(conn, 'tips_alerts')
         conn.commit()
         conn.close()
         flash('تم تحديث النصيحة/التنبيه بنجاح.', 'success')
@@ -779,11 +1202,153 @@ def admin_edit_tip_alert(item_id):
 def admin_delete_tip_alert(item_id):
     conn = get_db_connection()
     conn.execute("DELETE FROM tips_alerts WHERE id = ?", (item_id,))
+    page_cache.invalidate(conn, 'tips_alerts')
     conn.commit()
     conn.close()
     flash('تم حذف النصيحة/التنبيه بنجاح.', 'success')
     return redirect(url_for('admin_tips_alerts'))
 
+# --- Routes: Admin Bulk Import ---
+
+def run_import(conn, bundle, upsert, dry_run):
+    """Import a bundle in one transaction, rolled back for a dry run."""
+    try:
+        counts = import_bundle(conn, bundle, upsert=upsert)
+        page_cache.invalidate(conn, 'articles', 'tips_alerts')
+    except Exception:
+        conn.rollback()
+        raise
+    if dry_run:
+        conn.rollback()
+    else:
+        conn.commit()
+    return counts
+
+@app.route('/admin/import', methods=['POST'])
+@admin_required
+def admin_import():
+    """Load a JSON bundle of articles, tips/alerts and quizzes (see content_import.py)."""
+    # JSON only: browsers cannot send it cross-site without a CORS preflight
+    if not request.is_json:
+        return jsonify({'errors': ['Content-Type must be application/json']}), 415
+    bundle = request.get_json(silent=True)
+    upsert = request.args.get('upsert', type=int) == 1
+    dry_run = request.args.get('dry_run', type=int) == 1
+    
+    conn = get_db_connection()
+    try:
+        counts = run_import(conn, bundle, upsert, dry_run)
+    except BundleError as e:
+        return jsonify({'errors': e.errors}), 400
+    finally:
+        conn.close()
+    return jsonify({'dry_run': dry_run, 'upsert': upsert, 'counts': counts})
+
+# --- CLI Commands ---
+
+@app.cli.command('regrade-quiz')
+@click.argument('quiz_id', type=int)
+def regrade_quiz_command(quiz_id):
+    """Re-grade stored attempts of a quiz against its current answer key."""
+    conn = get_db_connection()
+    compiled = quiz_cache.get(conn, quiz_id)
+    if not compiled:
+        raise click.ClickException(f'Quiz {quiz_id} not found.')
+    changed = regrade_quiz_attempts(conn, compiled)
+    click.echo(f'Re-graded quiz {quiz_id}: {changed} attempt(s) changed.')
+
+@app.cli.command('check-stats')
+@click.option('--fix', is_flag=True, help='Overwrite drifted counters with the recomputed values.')
+def check_stats_command(fix):
+    """Recompute stats counters from scratch and report any drift."""
+    conn = get_db_connection()
+    drift = recount(conn, fix=fix)
+    conn.commit()
+    if not drift:
+        click.echo('All counters are consistent.')
+        return
+    for name, (stored, actual) in sorted(drift.items()):
+        click.echo(f'{name}: stored={stored} actual={actual}')
+    click.echo(f'{len(drift)} counter(s) drifted' + (' and were fixed.' if fix else '.'))
+    if not fix:
+        raise SystemExit(1)
+
+@app.cli.command('slow-queries')
+@click.option('--limit', type=int, default=20, show_default=True)
+@click.option('--full-scans', is_flag=True, help='Only queries whose plan scans a table without an index.')
+@click.option('--reset', is_flag=True, help='Forget all recorded slow queries.')
+def slow_queries_command(limit, full_scans, reset):
+    """List the slow queries with the most total time, with their query plans."""
+    conn = get_db_connection()
+    if reset:
+        conn.execute("DELETE FROM slow_queries")
+        conn.commit()
+        click.echo('Slow query log cleared.')
+        return
+    rows = top_slow_queries(conn, limit, full_scans_only=full_scans)
+    if not rows:
+        click.echo('No slow queries recorded.')
+        return
+    for row in rows:
+        click.echo(f"{row['fingerprint']}  {row['calls']} call(s)  total {row['total_seconds'] * 1000:.1f} ms  "
+                   f"max {row['max_seconds'] * 1000:.1f} ms  {row['endpoint'] or '-'}"
+                   + ('  FULL SCAN' if row['full_scan'] else ''))
+        click.echo(f"  {row['sql']}")
+        click.echo(f"  params {row['params_shape']}  last seen {row['last_seen']}")
+        for line in (row['plan'] or '(no plan)').splitlines():
+            click.echo(f"    {line}")
+
+@app.cli.command('import-content')
+@click.argument('bundle_file', type=click.File('rb'))
+@click.option('--upsert', is_flag=True, help='Update rows whose external key already exists.')
+@click.option('--dry-run', is_flag=True, help='Validate and load, then roll back.')
+def import_content_command(bundle_file, upsert, dry_run):
+    """Import articles, tips/alerts and quizzes from a JSON bundle."""
+    try:
+        bundle = json.load(bundle_file)
+    except ValueError as e:
+        raise click.ClickException(f'Invalid JSON: {e}')
+    conn = get_db_connection()
+    try:
+        counts = run_import(conn, bundle, upsert, dry_run)
+    except BundleError as e:
+        for error in e.errors:
+            click.echo(error, err=True)
+        raise click.ClickException(str(e))
+    finally:
+        conn.close()
+    for section, count in counts.items():
+        click.echo(f"{section}: {count['created']} created, {count['updated']} updated")
+    if dry_run:
+        click.echo('Dry run: nothing was written.')
+
+@app.cli.command('build-assets')
+def build_assets_command():
+    """Hash static files and write their precompressed siblings."""
+    assets = StaticAssets(app.static_folder, exclude=app.config['STATIC_EXCLUDE']).build()
+    click.echo(f'Built {len(assets)} static asset(s).')
+
+jobs_cli = AppGroup('jobs', help='Background job queue.')
+
+@jobs_cli.command('run')
+@click.option('--threads', type=int, default=2, show_default=True)
+@click.option('--once', is_flag=True, help='Run until no job is runnable, then exit.')
+def jobs_run_command(threads, once):
+    """Run background job workers in this process."""
+    worker = JobWorker(app.config['DATABASE'], threads=threads, poll_interval=app.config['JOBS_POLL_INTERVAL'])
+    if once:
+        click.echo(f'Ran {worker.run_until_empty()} job(s).')
+        return
+    worker.start()
+    click.echo(f'Job worker running with {threads} thread(s). Press Ctrl+C to stop.')
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        worker.stop()
+
+app.cli.add_command(jobs_cli)
+
 if __name__ == '__main__':
     # For local development
     app.run(debug=True)
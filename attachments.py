@@ -0,0 +1,138 @@
+import hashlib
+import logging
+import os
+import tempfile
+from collections import namedtuple
+from jobs import register_job
+
+logger = logging.getLogger(__name__)
+
+# Leading bytes of each accepted type -> (mime type, stored extension)
+MAGIC_SIGNATURES = [
+    (b'\xff\xd8\xff', ('image/jpeg', 'jpg')),
+    (b'\x89PNG\r\n\x1a\n', ('image/png', 'png')),
+    (b'%PDF-', ('application/pdf', 'pdf')),
+]
+SNIFF_LENGTH = max(len(signature) for signature, _ in MAGIC_SIGNATURES)
+
+# mime type -> marker that must appear near the end of a complete file
+END_MARKERS = {
+    'image/jpeg': b'\xff\xd9',
+    'image/png': b'IEND\xaeB`\x82',
+    'application/pdf': b'%%EOF',
+}
+END_MARKER_WINDOW = 1024  # trailing bytes searched; PDFs may carry padding after %%EOF
+
+StoredAttachment = namedtuple('StoredAttachment', 'sha256 file_path mime_type size')
+
+class InvalidAttachment(Exception):
+    """Raised when an upload's content is not one of the accepted types."""
+
+def sniff_type(head):
+    for signature, kind in MAGIC_SIGNATURES:
+        if head.startswith(signature):
+            return kind
+    return None
+
+def shard_path(sha256, extension):
+    """Relative storage path: ab/cd/abcd....ext"""
+    return os.path.join(sha256[:2], sha256[2:4], f'{sha256}.{extension}')
+
+def store_upload(stream, upload_folder, chunk_size=64 * 1024):
+    """Stream an upload to content-addressed storage under upload_folder.
+
+    The file is copied in chunks to a temporary file while its SHA-256 is
+    computed, its type is sniffed from the first bytes, and it is then moved
+    to a sharded path named after the hash. If the same content is already
+    stored, the new copy is discarded. Returns a StoredAttachment whose
+    file_path is relative to upload_folder.
+    """
+    head = stream.read(chunk_size)
+    # Tiny reads are legal on streams; make sure we have enough to sniff
+    while len(head) < SNIFF_LENGTH:
+        more = stream.read(chunk_size)
+        if not more:
+            break
+        head += more
+    kind = sniff_type(head)
+    if kind is None:
+        raise InvalidAttachment()
+    mime_type, extension = kind
+
+    tmp_dir = os.path.join(upload_folder, 'tmp')
+    os.makedirs(tmp_dir, exist_ok=True)
+    digest = hashlib.sha256()
+    size = 0
+    fd, tmp_path = tempfile.mkstemp(dir=tmp_dir)
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            chunk = head
+            while chunk:
+                digest.update(chunk)
+                out.write(chunk)
+                size += len(chunk)
+                chunk = stream.read(chunk_size)
+
+        sha256 = digest.hexdigest()
+        relative_path = shard_path(sha256, extension)
+        final_path = os.path.join(upload_folder, relative_path)
+        if os.path.exists(final_path):
+            os.unlink(tmp_path)
+        else:
+            os.makedirs(os.path.dirname(final_path), exist_ok=True)
+            os.replace(tmp_path, final_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+    return StoredAttachment(sha256, relative_path.replace(os.sep, '/'), mime_type, size)
+
+def record_attachment(conn, attachment):
+    """Register stored content once; later reports with the same hash reuse the row.
+
+    Returns True if the content is new and still needs scanning.
+    """
+    cursor = conn.execute(
+        "INSERT OR IGNORE INTO attachments (sha256, file_path, mime_type, size) VALUES (?, ?, ?, ?)",
+        (attachment.sha256, attachment.file_path, attachment.mime_type, attachment.size)
+    )
+    return cursor.rowcount == 1
+
+def scan_file(path, sha256, mime_type, size, chunk_size=64 * 1024):
+    """Reasons a stored attachment is unacceptable; empty if it is clean.
+
+    Re-reads the whole file: the hash and size must match what was recorded
+    at upload, and the file must end like a complete file of its type.
+    """
+    digest = hashlib.sha256()
+    total = 0
+    tail = b''
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+            total += len(chunk)
+            tail = (tail + chunk)[-END_MARKER_WINDOW:]
+    problems = []
+    if digest.hexdigest() != sha256 or total != size:
+        problems.append('content does not match the recorded hash')
+    marker = END_MARKERS.get(mime_type)
+    if marker and marker not in tail:
+        problems.append(f'truncated or malformed {mime_type}')
+    return problems
+
+@register_job('attachment.scan', concurrency=2)
+def scan_attachment_job(conn, payload):
+    """Scan a newly stored attachment after the report has been accepted."""
+    attachment = conn.execute(
+        "SELECT sha256, file_path, mime_type, size FROM attachments WHERE sha256 = ?", (payload['sha256'],)
+    ).fetchone()
+    if attachment is None:
+        return
+    problems = scan_file(os.path.join(payload['upload_folder'], attachment['file_path']),
+                         attachment['sha256'], attachment['mime_type'], attachment['size'])
+    if problems:
+        logger.warning("Attachment %s rejected: %s", attachment['sha256'], '; '.join(problems))
+    conn.execute(
+        "UPDATE attachments SET scan_status = ?, scanned_at = CURRENT_TIMESTAMP WHERE sha256 = ?",
+        ('rejected' if problems else 'clean', attachment['sha256'])
+    )
@@ -0,0 +1,48 @@
+import threading
+import time
+from collections import namedtuple
+
+AuthEntry = namedtuple('AuthEntry', 'role is_active auth_version expires_at')
+
+class AuthCache:
+    """Per-worker cache of a user's role and active flag.
+
+    Entries are keyed by (user_id, auth_version), where auth_version is the
+    value stored in the session at login. Changing a user's role or active
+    flag bumps users.auth_version (see migration 9), so once an entry
+    expires the session's version no longer matches and the check fails.
+    Staleness across workers is bounded by `ttl` seconds; code that changes
+    a user's role or active flag calls invalidate() so the worker making the
+    change applies it at once.
+    """
+
+    def __init__(self, loader, ttl=30):
+        self.loader = loader
+        self.ttl = ttl
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, user_id, auth_version):
+        """Return the AuthEntry for a session, or None if the user is gone or the session is stale."""
+        key = (user_id, auth_version)
+        entry = self._entries.get(key)
+        if entry is not None and entry.expires_at > time.monotonic():
+            return entry
+
+        row = self.loader(user_id)
+        with self._lock:
+            # Drop every cached version of this user, fresh or not
+            for cached_key in [k for k in self._entries if k[0] == user_id]:
+                del self._entries[cached_key]
+            if row is None or row['auth_version'] != auth_version:
+                return None
+            entry = AuthEntry(row['role'], bool(row['is_active']), row['auth_version'],
+                              time.monotonic() + self.ttl)
+            self._entries[key] = entry
+        return entry
+
+    def invalidate(self, user_id):
+        """Forget every cached version of a user."""
+        with self._lock:
+            for cached_key in [k for k in self._entries if k[0] == user_id]:
+                del self._entries[cached_key]
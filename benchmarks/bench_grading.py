@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark of quiz grading throughput on a single core.
+Run from the project root: python benchmarks/bench_grading.py
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from grading import parse_answers, grade, grade_many
+
+def run(label, fn, count, repeat):
+    best = min(_timed(fn) for _ in range(repeat))
+    print(f"{label:<32} {count / best:>14,.0f} submissions/s  ({best * 1e6 / count:.2f} us each)")
+
+def _timed(fn):
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--questions', type=int, default=20)
+    parser.add_argument('--submissions', type=int, default=50000)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    question_ids = tuple(range(1000, 1000 + args.questions))
+    answer_key = tuple(rng.randrange(4) for _ in question_ids)
+    submissions = [tuple(rng.randrange(4) for _ in question_ids) for _ in range(args.submissions)]
+    forms = [{f'question_{q}': str(a) for q, a in zip(question_ids, answers)}
+             for answers in submissions[:min(args.submissions, 10000)]]
+
+    print(f"{args.questions} questions, {args.submissions:,} submissions, best of {args.repeat}")
+    run('parse_answers', lambda: [parse_answers(f, question_ids) for f in forms], len(forms), args.repeat)
+    run('grade (one at a time)', lambda: [grade(answer_key, s) for s in submissions], len(submissions), args.repeat)
+    run('grade_many (batch)', lambda: grade_many(answer_key, submissions), len(submissions), args.repeat)
+
+if __name__ == '__main__':
+    main()
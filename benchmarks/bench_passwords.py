@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Logins per second per core for each password hashing cost setting.
+Run from the project root: python benchmarks/bench_passwords.py
+
+Use the results to pick PASSWORD_HASH_METHOD and to size gunicorn workers
+and PASSWORD_HASH_WORKERS for peak login waves.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from werkzeug.security import generate_password_hash, check_password_hash
+
+DEFAULT_METHODS = [
+    'pbkdf2:sha256:260000',
+    'pbkdf2:sha256:600000',
+    'pbkdf2:sha256:1000000',
+    'scrypt:16384:8:1',
+    'scrypt:32768:8:1',
+]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--duration', type=float, default=2.0, help='seconds to spend per method')
+    parser.add_argument('methods', nargs='*', default=DEFAULT_METHODS)
+    args = parser.parse_args()
+
+    password = 'User123456!'
+    print(f"{'method':<28} {'ms/login':>10} {'logins/s/core':>14}")
+    for method in args.methods:
+        stored = generate_password_hash(password, method)
+        count = 0
+        start = time.perf_counter()
+        while time.perf_counter() - start < args.duration:
+            check_password_hash(stored, password)
+            count += 1
+        elapsed = time.perf_counter() - start
+        print(f"{method:<28} {elapsed * 1000 / count:>10.1f} {count / elapsed:>14.1f}")
+
+if __name__ == '__main__':
+    main()
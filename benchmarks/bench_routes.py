@@ -0,0 +1,401 @@
+#!/usr/bin/env python3
+"""
+End-to-end latency of every route against small, medium and large databases.
+Run from the project root: python benchmarks/bench_routes.py
+
+Each route is requested as a guest, a user or an admin through the Flask
+test client (or over HTTP against a local gunicorn with --gunicorn) from
+--concurrency threads. Reports p50/p95/p99 latency, throughput and, with
+the test client, SQL statements per request. Results are written as JSON;
+with --baseline they are compared against a previous run and the exit
+status is 1 if a route got slower or issues more queries than before.
+
+    python benchmarks/bench_routes.py --sizes small medium --output bench.json
+    python benchmarks/bench_routes.py --baseline bench.json
+"""
+
+import argparse
+import http.client
+import json
+import os
+import platform
+import shutil
+import socket
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+DATA_DIR = os.path.join(ROOT, 'benchmarks', 'data')
+
+# size -> seed_db.py --scale arguments (None: sample data only)
+SIZES = {
+    'small': None,
+    'medium': ['--users', '1000', '--reports', '50000', '--attempts', '20000'],
+    'large': ['--users', '10000', '--reports', '1000000', '--attempts', '200000'],
+}
+
+USER_EMAIL = 'ahmed@example.com'
+ATTACHMENT_SIZE = 256 * 1024
+
+# (name, method, path, role, form data). Paths are formatted with ids picked from the database.
+ROUTES = [
+    ('index', 'GET', '/', None, None),
+    ('articles', 'GET', '/articles', None, None),
+    ('article_detail', 'GET', '/article/{article_id}', None, None),
+    ('tips', 'GET', '/tips', None, None),
+    ('alerts', 'GET', '/alerts', None, None),
+    ('search', 'GET', '/search?q=password', None, None),
+    ('login', 'GET', '/login', None, None),
+    ('register', 'GET', '/register', None, None),
+    ('quizzes', 'GET', '/quizzes', 'user', None),
+    ('take_quiz', 'GET', '/quiz/{quiz_id}', 'user', None),
+    ('submit_quiz', 'POST', '/submit-quiz/{quiz_id}', 'user', {'question_1': '1', 'question_2': '2'}),
+    ('quiz_result', 'GET', '/quiz/{quiz_id}/result?score=80', 'user', None),
+    ('submit_report', 'GET', '/report', 'user', None),
+    ('submit_report_post', 'POST', '/report', 'user',
+     {'report_type': 'XSS', 'title': 'Benchmark report', 'description': 'Generated by bench_routes.py'}),
+    ('my_reports', 'GET', '/my-reports', 'user', None),
+    ('report_detail', 'GET', '/report/{user_report_id}', 'user', None),
+    ('download_attachment', 'GET', '/report/{attachment_report_id}/attachment', 'user', None),
+    ('admin_dashboard', 'GET', '/admin', 'admin', None),
+    ('admin_reports', 'GET', '/admin/reports', 'admin', None),
+    ('admin_reports_filtered', 'GET', '/admin/reports?status=new&type=XSS', 'admin', None),
+    ('admin_export_reports', 'GET', '/admin/reports/export?format=csv&status=new&after_id={recent_report_id}',
+     'admin', None),
+    ('admin_report_detail', 'GET', '/admin/report/{report_id}', 'admin', None),
+    ('update_report_status', 'POST', '/admin/report/{report_id}/update-status', 'admin', {'status': 'in_review'}),
+    ('admin_articles', 'GET', '/admin/articles', 'admin', None),
+    ('admin_edit_article', 'GET', '/admin/article/{article_id}/edit', 'admin', None),
+    ('admin_quizzes', 'GET', '/admin/quizzes', 'admin', None),
+    ('admin_quiz_questions', 'GET', '/admin/quiz/{quiz_id}/questions', 'admin', None),
+    ('admin_edit_quiz', 'GET', '/admin/quiz/edit/{quiz_id}', 'admin', None),
+    ('admin_edit_question', 'GET', '/admin/quiz/{quiz_id}/question/edit/{question_id}', 'admin', None),
+    ('admin_tips_alerts', 'GET', '/admin/tips-alerts', 'admin', None),
+    ('admin_edit_tip_alert', 'GET', '/admin/tips-alerts/edit/{tip_id}', 'admin', None),
+    ('admin_slow_queries', 'GET', '/admin/slow-queries', 'admin', None),
+    ('prometheus_metrics', 'GET', '/metrics', 'admin', None),
+]
+
+# Endpoints deliberately left out: they end the session, only redirect, or destroy content
+SKIPPED_ENDPOINTS = {
+    'logout', 'set_language', 'static', 'admin_import',
+    'admin_new_article', 'admin_delete_article', 'admin_new_quiz', 'admin_delete_quiz',
+    'admin_new_question', 'admin_delete_question', 'admin_new_tip_alert', 'admin_delete_tip_alert',
+}
+
+# --- Databases ---
+
+def ensure_database(size, rebuild):
+    """Seeded database for `size`, generated once and reused across runs."""
+    path = os.path.join(DATA_DIR, f'{size}.sqlite')
+    if os.path.exists(path) and not rebuild:
+        return path
+    os.makedirs(DATA_DIR, exist_ok=True)
+    args = [sys.executable, os.path.join(ROOT, 'seed_db.py'), '--reset']
+    if SIZES[size]:
+        args += ['--scale', *SIZES[size]]
+    print(f"Seeding {size} database...", file=sys.stderr)
+    subprocess.run(args, check=True, cwd=ROOT, env=dict(os.environ, DATABASE=path), stdout=subprocess.DEVNULL)
+    return path
+
+def pick_ids(database):
+    conn = sqlite3.connect(database)
+    one = lambda sql, *params: conn.execute(sql, params).fetchone()[0]
+    user_id = one("SELECT id FROM users WHERE email = ?", USER_EMAIL)
+    ids = {
+        'article_id': one("SELECT MIN(id) FROM articles"),
+        'quiz_id': one("SELECT MIN(id) FROM quizzes"),
+        'question_id': one("SELECT MIN(id) FROM quiz_questions WHERE quiz_id = (SELECT MIN(id) FROM quizzes)"),
+        'tip_id': one("SELECT MIN(id) FROM tips_alerts"),
+        'report_id': one("SELECT MAX(id) FROM reports"),
+        'recent_report_id': max(one("SELECT MAX(id) FROM reports") - 1000, 0),
+        'user_report_id': one("SELECT MAX(id) FROM reports WHERE user_id = ?", user_id),
+    }
+    conn.close()
+    return ids
+
+def seed_attachment(app):
+    """A report by the sample user with a stored PDF attachment. Returns the report id.
+
+    Uploads live outside the database, so this runs in the child process
+    against its throwaway UPLOAD_FOLDER.
+    """
+    import io
+    from attachments import store_upload, record_attachment
+    from models import connect
+    content = b'%PDF-1.4\n' + b'0' * ATTACHMENT_SIZE + b'\n%%EOF\n'
+    attachment = store_upload(io.BytesIO(content), app.config['UPLOAD_FOLDER'])
+    conn = connect(app.config['DATABASE'])
+    with conn:
+        record_attachment(conn, attachment)
+        report_id = conn.execute(
+            "INSERT INTO reports (user_id, report_type, title, description, file_path, attachment_sha256, status) "
+            "SELECT id, 'Other', 'Benchmark attachment', 'Generated by bench_routes.py', ?, ?, 'new' "
+            "FROM users WHERE email = ?",
+            (attachment.file_path, attachment.sha256, USER_EMAIL)
+        ).lastrowid
+    conn.close()
+    return report_id
+
+# --- Clients ---
+
+def session_cookies(app):
+    """Signed session cookies for the sample user and the admin, as after logging in."""
+    from models import connect
+    serializer = app.session_interface.get_signing_serializer(app)
+    conn = connect(app.config['DATABASE'])
+    cookies = {None: None}
+    for role, email in (('user', USER_EMAIL), ('admin', app.config['ADMIN_EMAIL'])):
+        user = conn.execute("SELECT id, email, role, auth_version FROM users WHERE email = ?", (email,)).fetchone()
+        cookies[role] = serializer.dumps({'user_id': user['id'], 'user_email': user['email'],
+                                          'user_role': user['role'], 'auth_version': user['auth_version']})
+    conn.close()
+    return cookies
+
+class TestClientTarget:
+    """Requests through app.test_client(); reads the request's SQL statement count from g.query_stats.
+
+    That is the count the app itself reports in sql_queries_per_request: one
+    per statement the view executes, without the trigger and FTS shadow-table
+    sub-statements a trace callback would also see.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.cookies = session_cookies(app)
+        self._local = threading.local()
+
+        @app.after_request
+        def count_queries(response):
+            from flask import g
+            stats = g.get('query_stats')
+            self._local.queries = stats.count if stats is not None else 0
+            return response
+
+    def client(self, role):
+        client = self.app.test_client()
+        if self.cookies[role]:
+            client.set_cookie(self.app.config['SESSION_COOKIE_NAME'], self.cookies[role])
+        return client
+
+    def request(self, client, method, path, data):
+        self._local.queries = 0
+        response = client.open(path, method=method, data=data)
+        response.close()
+        return response.status_code, self._local.queries
+
+class GunicornTarget:
+    """Requests over keep-alive HTTP connections to a locally started gunicorn."""
+
+    def __init__(self, app, workers, threads):
+        self.cookie_name = app.config['SESSION_COOKIE_NAME']
+        self.cookies = session_cookies(app)
+        with socket.socket() as s:
+            s.bind(('127.0.0.1', 0))
+            self.port = s.getsockname()[1]
+        self.process = subprocess.Popen(
+            ['gunicorn', '--workers', str(workers), '--threads', str(threads), '--bind', f'127.0.0.1:{self.port}',
+             '--log-level', 'warning', 'app:app'],
+            cwd=ROOT, env=os.environ.copy()
+        )
+        deadline = time.time() + 30
+        while time.time() < deadline:
+            try:
+                socket.create_connection(('127.0.0.1', self.port), timeout=1).close()
+                return
+            except OSError:
+                time.sleep(0.2)
+        self.close()
+        raise RuntimeError('gunicorn did not start')
+
+    def client(self, role):
+        return (http.client.HTTPConnection('127.0.0.1', self.port), self.cookies[role])
+
+    def request(self, client, method, path, data):
+        conn, cookie = client
+        headers = {'Cookie': f'{self.cookie_name}={cookie}'} if cookie else {}
+        body = None
+        if data:
+            from urllib.parse import urlencode
+            body = urlencode(data)
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        conn.request(method, path, body=body, headers=headers)
+        response = conn.getresponse()
+        response.read()
+        return response.status, None
+
+    def close(self):
+        self.process.terminate()
+        self.process.wait(10)
+
+# --- Measurement ---
+
+def percentile(sorted_values, p):
+    index = min(len(sorted_values) - 1, max(0, round(p / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+def bench_route(target, route, ids, requests, concurrency, warmup):
+    name, method, path, role, data = route
+    path = path.format(**ids)
+    per_thread = max(1, requests // concurrency)
+
+    def worker(_):
+        client = target.client(role)
+        for _ in range(warmup):
+            target.request(client, method, path, data)
+        timings, queries, statuses = [], [], set()
+        for _ in range(per_thread):
+            start = time.perf_counter()
+            status, count = target.request(client, method, path, data)
+            timings.append(time.perf_counter() - start)
+            queries.append(count)
+            statuses.add(status)
+        return timings, queries, statuses
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        results = list(pool.map(worker, range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    timings = sorted(t for r in results for t in r[0])
+    queries = [q for r in results for q in r[1] if q is not None]
+    return {
+        'requests': len(timings),
+        'status': sorted(set().union(*(r[2] for r in results))),
+        'p50_ms': round(percentile(timings, 50) * 1000, 3),
+        'p95_ms': round(percentile(timings, 95) * 1000, 3),
+        'p99_ms': round(percentile(timings, 99) * 1000, 3),
+        'mean_ms': round(statistics.fmean(timings) * 1000, 3),
+        'rps': round(len(timings) / elapsed, 1),
+        'queries_per_request': round(statistics.fmean(queries), 2) if queries else None,
+    }
+
+def run_size(args):
+    """Child process body: the app reads DATABASE at import, so each size gets its own process."""
+    from app import app
+
+    covered = {name for name, *_ in ROUTES}
+    missing = sorted(rule.endpoint for rule in app.url_map.iter_rules()
+                     if rule.endpoint not in covered | SKIPPED_ENDPOINTS)
+    if missing:
+        print(f"warning: routes without a benchmark: {', '.join(missing)}", file=sys.stderr)
+
+    ids = pick_ids(app.config['DATABASE'])
+    ids['attachment_report_id'] = seed_attachment(app)
+    target = (GunicornTarget(app, args.gunicorn_workers, args.concurrency) if args.gunicorn
+              else TestClientTarget(app))
+    results = {}
+    try:
+        for route in ROUTES:
+            if args.routes and route[0] not in args.routes:
+                continue
+            results[route[0]] = result = bench_route(target, route, ids, args.requests, args.concurrency, args.warmup)
+            print(f"  {route[0]:<26} p50 {result['p50_ms']:>8.2f}ms  p95 {result['p95_ms']:>8.2f}ms  "
+                  f"p99 {result['p99_ms']:>8.2f}ms  {result['rps']:>8.1f} req/s  "
+                  f"queries {result['queries_per_request']}", file=sys.stderr)
+    finally:
+        if args.gunicorn:
+            target.close()
+    return results
+
+# --- Baseline comparison ---
+
+def compare(results, baseline, threshold, min_delta_ms):
+    """Regressions as printable lines: p95 beyond threshold, or more queries per request."""
+    regressions = []
+    for size, routes in results['sizes'].items():
+        for name, current in routes.items():
+            previous = baseline.get('sizes', {}).get(size, {}).get(name)
+            if not previous:
+                continue
+            if (current['p95_ms'] > previous['p95_ms'] * threshold
+                    and current['p95_ms'] - previous['p95_ms'] > min_delta_ms):
+                regressions.append(f"{size}/{name}: p95 {previous['p95_ms']:.2f}ms -> {current['p95_ms']:.2f}ms")
+            if (current['queries_per_request'] is not None and previous.get('queries_per_request') is not None
+                    and current['queries_per_request'] > previous['queries_per_request']):
+                regressions.append(f"{size}/{name}: queries/request {previous['queries_per_request']} -> "
+                                   f"{current['queries_per_request']}")
+    return regressions
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', nargs='+', choices=list(SIZES), default=['small'])
+    parser.add_argument('--requests', type=int, default=200, help='measured requests per route')
+    parser.add_argument('--warmup', type=int, default=5, help='unmeasured requests per thread and route')
+    parser.add_argument('--concurrency', type=int, default=4, help='client threads')
+    parser.add_argument('--routes', nargs='*', help='only these route names')
+    parser.add_argument('--gunicorn', action='store_true', help='benchmark a local gunicorn over HTTP')
+    parser.add_argument('--gunicorn-workers', type=int, default=2)
+    parser.add_argument('--rebuild', action='store_true', help='regenerate the seeded databases')
+    parser.add_argument('--output', help='write results to this JSON file')
+    parser.add_argument('--baseline', help='compare against this JSON file from a previous run')
+    parser.add_argument('--threshold', type=float, default=1.25, help='allowed p95 slowdown ratio')
+    parser.add_argument('--min-delta-ms', type=float, default=1.0, help='ignore p95 changes smaller than this')
+    parser.add_argument('--run-size', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_size:
+        json.dump(run_size(args), sys.stdout)
+        return
+
+    results = {
+        'meta': {
+            'revision': git_revision(),
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'mode': 'gunicorn' if args.gunicorn else 'test_client',
+            'concurrency': args.concurrency,
+            'requests': args.requests,
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        },
+        'sizes': {},
+    }
+    # Forward everything except the options the parent handles itself
+    child_args = [a for a in sys.argv[1:] if a not in ('--rebuild',)]
+    for size in args.sizes:
+        source = ensure_database(size, args.rebuild)
+        # Write routes modify the database: benchmark a throwaway copy
+        with tempfile.TemporaryDirectory() as tmp:
+            database = os.path.join(tmp, 'bench.sqlite')
+            shutil.copyfile(source, database)
+            print(f"{size}:", file=sys.stderr)
+            completed = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), *child_args, '--run-size', size],
+                cwd=ROOT, env=dict(os.environ, DATABASE=database, UPLOAD_FOLDER=os.path.join(tmp, 'uploads')),
+                stdout=subprocess.PIPE, text=True, check=True
+            )
+            results['sizes'][size] = json.loads(completed.stdout)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.threshold, args.min_delta_ms)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+        print("No regressions against baseline.", file=sys.stderr)
+
+if __name__ == '__main__':
+    main()
@@ -5,9 +5,52 @@ class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'a_very_secret_key_for_cyberport_project_2025'
     
     # إعدادات قاعدة البيانات والتحميل
-    DATABASE = 'database.sqlite'
-    UPLOAD_FOLDER = 'static/uploads'
+    DATABASE = os.environ.get('DATABASE') or 'database.sqlite'
+    # خارج مجلد static: المرفقات تُقدَّم فقط عبر مسار التنزيل المحمي
+    UPLOAD_FOLDER = os.environ.get('UPLOAD_FOLDER') or 'uploads'
     MAX_CONTENT_LENGTH = 5 * 1024 * 1024  # 5MB limit for uploads
+    ATTACHMENT_CHUNK_SIZE = 64 * 1024  # bytes per read when streaming uploads to disk
+    ATTACHMENT_MAX_AGE = 24 * 3600  # seconds browsers may cache a downloaded attachment
+    # Internal nginx location mapped to UPLOAD_FOLDER, e.g. '/protected-uploads/'.
+    # When set, downloads are handed off with X-Accel-Redirect instead of sent by Python.
+    ATTACHMENT_ACCEL_REDIRECT = os.environ.get('ATTACHMENT_ACCEL_REDIRECT')
+
+    # إعدادات اتصال SQLite (اتصال واحد لكل خيط عامل)
+    SQLITE_JOURNAL_MODE = 'WAL'
+    SQLITE_SYNCHRONOUS = 'NORMAL'
+    SQLITE_BUSY_TIMEOUT = 5000  # milliseconds
+    SQLITE_MMAP_SIZE = 256 * 1024 * 1024  # bytes
+    SQLITE_CACHE_SIZE = -64000  # negative value = KiB (~64MB)
+
+    # عداد المشاهدات المؤجل: يُكتب إلى القاعدة دفعة واحدة
+    VIEW_COUNTER_FLUSH_INTERVAL = 10  # seconds
+    VIEW_COUNTER_FLUSH_THRESHOLD = 100  # buffered views
+
+    # الملفات الثابتة: روابط تحمل بصمة المحتوى، لذا يمكن تخزينها مؤقتاً بلا انتهاء
+    STATIC_MAX_AGE = 365 * 24 * 3600  # seconds
+    STATIC_EXCLUDE = ('uploads',)  # static/ subfolders holding user files, not assets
+
+    # ذاكرة مؤقتة للصفحات العامة المعروضة (لكل عامل)
+    PAGE_CACHE_MAX_BYTES = 16 * 1024 * 1024  # total size of cached page bodies
+    PAGE_CACHE_TTL = 60  # seconds; bounds staleness of view counts
+
+    # المهام الخلفية: خيوط داخل كل عامل ويب (0 = فقط عبر 'flask jobs run')
+    JOBS_WORKER_THREADS = int(os.environ.get('JOBS_WORKER_THREADS', 1))
+    JOBS_POLL_INTERVAL = 2  # seconds
+
+    # مقاييس Prometheus على /metrics (للمشرفين، أو لأداة الجمع عبر رمز Bearer)
+    METRICS_FLUSH_INTERVAL = 15  # seconds between writes of each worker's buffered metrics
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+
+    # سجل الاستعلامات البطيئة مع خطة التنفيذ (EXPLAIN QUERY PLAN)
+    SLOW_QUERY_THRESHOLD_MS = float(os.environ.get('SLOW_QUERY_THRESHOLD_MS', 100))  # 0 disables
+    SLOW_QUERY_FLUSH_INTERVAL = 15  # seconds
+
+    # عدد العناصر في كل صفحة
+    ARTICLES_PER_PAGE = 12
+    REPORTS_PER_PAGE = 50
+    REPORTS_MAX_PER_PAGE = 200
+    SEARCH_RESULTS_LIMIT = 20
     
     # إعدادات اللغة
     LANGUAGES = ['ar', 'en']
@@ -16,6 +59,13 @@ class Config:
     # إعدادات المستخدمين
     ADMIN_EMAIL = 'admin@cyberport.local'
     ADMIN_PASSWORD = 'ChangeMe123!'
+    AUTH_CACHE_TTL = 30  # seconds a cached role/active check stays valid
+
+    # تجزئة كلمات المرور (صيغة werkzeug، مثل 'scrypt:32768:8:1' أو 'pbkdf2:sha256:600000')
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD') or 'scrypt:32768:8:1'
+    PASSWORD_HASH_WORKERS = 2
+    PASSWORD_HASH_MAX_PENDING = 8
+    PASSWORD_HASH_QUEUE_TIMEOUT = 10  # seconds
     
     # أنواع التقارير للثغرات
     REPORT_TYPES = {
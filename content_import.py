@@ -0,0 +1,231 @@
+"""
+Bulk import of articles, tips/alerts and quizzes from a JSON bundle.
+
+    {
+      "articles":    [{"key": ..., "title_ar", "title_en", "content_ar", "content_en", "is_published": true}],
+      "tips_alerts": [{"key": ..., "type": "tip" | "alert", "content_ar", "content_en"}],
+      "quizzes":     [{"key": ..., "title_ar", "title_en", "pass_score": 70,
+                       "questions": [{"key": ..., "question_ar", "question_en", "correct_option": 0,
+                                      "options": [{"ar": ..., "en": ...}, ...]}]}]
+    }
+
+`key` is an external key stored in the row's external_key column. It is
+optional for articles and tips, required for quizzes, and defaults to
+"<quiz key>#<position>" for questions. With upsert, rows whose key already
+exists are updated (a question's options are replaced); without it, an
+existing key is a validation error.
+"""
+
+import json
+from jobs import enqueue
+from models import make_excerpt
+
+SECTIONS = ('articles', 'tips_alerts', 'quizzes')
+TIP_TYPES = ('tip', 'alert')
+
+class BundleError(ValueError):
+    """The bundle failed validation; `errors` lists every problem found."""
+
+    def __init__(self, errors):
+        super().__init__(f'{len(errors)} validation error(s)')
+        self.errors = errors
+
+def _check_text(errors, item, path, fields):
+    for field in fields:
+        value = item.get(field)
+        if not isinstance(value, str) or not value.strip():
+            errors.append(f'{path}.{field}: required non-empty string')
+
+def _check_key(errors, item, path, seen, required=False):
+    key = item.get('key')
+    if key is None and not required:
+        return
+    if not isinstance(key, str) or not key:
+        errors.append(f'{path}.key: required non-empty string')
+    elif key in seen:
+        errors.append(f'{path}.key: duplicate key {key!r}')
+    else:
+        seen.add(key)
+
+def validate_bundle(bundle):
+    """Return a list of human-readable problems; empty if the bundle is valid.
+
+    Question keys are filled in from their quiz key and position as a side effect.
+    """
+    if not isinstance(bundle, dict):
+        return ['bundle: must be a JSON object']
+    errors = [f'{name}: unknown section' for name in bundle if name not in SECTIONS]
+    for name in SECTIONS:
+        if not isinstance(bundle.get(name, []), list):
+            errors.append(f'{name}: must be a list')
+    if errors:
+        return errors
+
+    keys = {name: set() for name in ('articles', 'tips_alerts', 'quizzes', 'questions')}
+    for i, article in enumerate(bundle.get('articles', [])):
+        path = f'articles[{i}]'
+        if not isinstance(article, dict):
+            errors.append(f'{path}: must be an object')
+            continue
+        _check_key(errors, article, path, keys['articles'])
+        _check_text(errors, article, path, ('title_ar', 'title_en', 'content_ar', 'content_en'))
+        if not isinstance(article.get('is_published', True), bool):
+            errors.append(f'{path}.is_published: must be a boolean')
+
+    for i, item in enumerate(bundle.get('tips_alerts', [])):
+        path = f'tips_alerts[{i}]'
+        if not isinstance(item, dict):
+            errors.append(f'{path}: must be an object')
+            continue
+        _check_key(errors, item, path, keys['tips_alerts'])
+        _check_text(errors, item, path, ('content_ar', 'content_en'))
+        if item.get('type') not in TIP_TYPES:
+            errors.append(f'{path}.type: must be one of {", ".join(TIP_TYPES)}')
+
+    for i, quiz in enumerate(bundle.get('quizzes', [])):
+        path = f'quizzes[{i}]'
+        if not isinstance(quiz, dict):
+            errors.append(f'{path}: must be an object')
+            continue
+        _check_key(errors, quiz, path, keys['quizzes'], required=True)
+        _check_text(errors, quiz, path, ('title_ar', 'title_en'))
+        pass_score = quiz.get('pass_score')
+        if not isinstance(pass_score, int) or isinstance(pass_score, bool) or not 0 <= pass_score <= 100:
+            errors.append(f'{path}.pass_score: integer between 0 and 100 required')
+        questions = quiz.get('questions', [])
+        if not isinstance(questions, list):
+            errors.append(f'{path}.questions: must be a list')
+            continue
+        for j, question in enumerate(questions):
+            qpath = f'{path}.questions[{j}]'
+            if not isinstance(question, dict):
+                errors.append(f'{qpath}: must be an object')
+                continue
+            if 'key' not in question and isinstance(quiz.get('key'), str):
+                question['key'] = f"{quiz['key']}#{j}"
+            _check_key(errors, question, qpath, keys['questions'], required=True)
+            _check_text(errors, question, qpath, ('question_ar', 'question_en'))
+            options = question.get('options')
+            if not isinstance(options, list) or len(options) < 2:
+                errors.append(f'{qpath}.options: at least 2 options required')
+                continue
+            for k, option in enumerate(options):
+                if not isinstance(option, dict):
+                    errors.append(f'{qpath}.options[{k}]: must be an object')
+                else:
+                    _check_text(errors, option, f'{qpath}.options[{k}]', ('ar', 'en'))
+            correct = question.get('correct_option')
+            if not isinstance(correct, int) or isinstance(correct, bool) or not 0 <= correct < len(options):
+                errors.append(f'{qpath}.correct_option: 0-based index into options required')
+    return errors
+
+def _existing_keys(conn, table, keys):
+    """{external_key: id} for the given keys already present in `table`."""
+    if not keys:
+        return {}
+    rows = conn.execute(
+        f"SELECT external_key, id FROM {table} WHERE external_key IN (SELECT value FROM json_each(?))",
+        (json.dumps(list(keys)),)
+    )
+    return dict(rows.fetchall())
+
+def import_bundle(conn, bundle, upsert=False):
+    """Validate and load `bundle` with one executemany per table.
+
+    Raises BundleError before anything is written. Otherwise opens a write
+    transaction and leaves it open: the caller commits, or rolls back for a
+    dry run. Returns {section: {'created': n, 'updated': n}}.
+    """
+    errors = validate_bundle(bundle)
+    if errors:
+        raise BundleError(errors)
+
+    articles = bundle.get('articles', [])
+    tips = bundle.get('tips_alerts', [])
+    quizzes = bundle.get('quizzes', [])
+    questions = [(quiz['key'], question) for quiz in quizzes for question in quiz.get('questions', [])]
+
+    conn.execute("BEGIN IMMEDIATE")
+    existing = {
+        'articles': _existing_keys(conn, 'articles', [a['key'] for a in articles if 'key' in a]),
+        'tips_alerts': _existing_keys(conn, 'tips_alerts', [t['key'] for t in tips if 'key' in t]),
+        'quizzes': _existing_keys(conn, 'quizzes', [q['key'] for q in quizzes]),
+        'questions': _existing_keys(conn, 'quiz_questions', [q['key'] for _, q in questions]),
+    }
+    if not upsert:
+        conflicts = [f'{section}: key {key!r} already exists'
+                     for section, found in existing.items() for key in found]
+        if conflicts:
+            conn.rollback()
+            raise BundleError(conflicts)
+
+    conn.executemany(
+        """
+        INSERT INTO articles (external_key, title_ar, title_en, content_ar, content_en,
+                              excerpt_ar, excerpt_en, is_published)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT (external_key) WHERE external_key IS NOT NULL DO UPDATE SET
+            title_ar = excluded.title_ar, title_en = excluded.title_en,
+            content_ar = excluded.content_ar, content_en = excluded.content_en,
+            excerpt_ar = excluded.excerpt_ar, excerpt_en = excluded.excerpt_en,
+            is_published = excluded.is_published, updated_at = CURRENT_TIMESTAMP
+        """,
+        [(a.get('key'), a['title_ar'], a['title_en'], a['content_ar'], a['content_en'],
+          make_excerpt(a['content_ar']), make_excerpt(a['content_en']), int(a.get('is_published', True)))
+         for a in articles]
+    )
+    conn.executemany(
+        """
+        INSERT INTO tips_alerts (external_key, type, content_ar, content_en) VALUES (?, ?, ?, ?)
+        ON CONFLICT (external_key) WHERE external_key IS NOT NULL DO UPDATE SET
+            type = excluded.type, content_ar = excluded.content_ar, content_en = excluded.content_en
+        """,
+        [(t.get('key'), t['type'], t['content_ar'], t['content_en']) for t in tips]
+    )
+    # Bumping version retires the compiled quiz cached by every worker
+    conn.executemany(
+        """
+        INSERT INTO quizzes (external_key, title_ar, title_en, pass_score) VALUES (?, ?, ?, ?)
+        ON CONFLICT (external_key) WHERE external_key IS NOT NULL DO UPDATE SET
+            title_ar = excluded.title_ar, title_en = excluded.title_en,
+            pass_score = excluded.pass_score, version = version + 1
+        """,
+        [(q['key'], q['title_ar'], q['title_en'], q['pass_score']) for q in quizzes]
+    )
+    quiz_ids = _existing_keys(conn, 'quizzes', [q['key'] for q in quizzes])
+    conn.executemany(
+        """
+        INSERT INTO quiz_questions (external_key, quiz_id, question_ar, question_en, correct_option)
+        VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT (external_key) WHERE external_key IS NOT NULL DO UPDATE SET
+            quiz_id = excluded.quiz_id, question_ar = excluded.question_ar,
+            question_en = excluded.question_en, correct_option = excluded.correct_option
+        """,
+        [(q['key'], quiz_ids[quiz_key], q['question_ar'], q['question_en'], q['correct_option'])
+         for quiz_key, q in questions]
+    )
+    question_ids = _existing_keys(conn, 'quiz_questions', [q['key'] for _, q in questions])
+    if existing['questions']:
+        conn.execute(
+            "DELETE FROM quiz_options WHERE question_id IN (SELECT value FROM json_each(?))",
+            (json.dumps(list(existing['questions'].values())),)
+        )
+    conn.executemany(
+        "INSERT INTO quiz_options (question_id, option_ar, option_en) VALUES (?, ?, ?)",
+        [(question_ids[q['key']], option['ar'], option['en']) for _, q in questions for option in q['options']]
+    )
+
+    # Updated answer keys: re-grade past attempts once the import commits
+    for quiz_id in existing['quizzes'].values():
+        enqueue(conn, 'quiz.regrade', {'quiz_id': quiz_id})
+
+    def counts(items, found):
+        updated = sum(1 for item in items if item.get('key') in found)
+        return {'created': len(items) - updated, 'updated': updated}
+
+    return {
+        'articles': counts(articles, existing['articles']),
+        'tips_alerts': counts(tips, existing['tips_alerts']),
+        'quizzes': counts(quizzes, existing['quizzes']),
+        'questions': counts([q for _, q in questions], existing['questions']),
+    }
@@ -0,0 +1,123 @@
+import json
+from collections import namedtuple
+from functools import lru_cache
+from itertools import compress
+from operator import eq
+from jobs import register_job
+from quiz_cache import compile_quiz
+
+UNANSWERED = -1
+FIELD_PREFIX = 'question_'
+
+class GradeResult(namedtuple('GradeResult', 'score total percentage correct_bitmap')):
+    """Outcome of grading one submission.
+
+    correct_bitmap has bit i set when the answer to the i-th question of the
+    answer key is correct.
+    """
+    __slots__ = ()
+
+def parse_answers(form, question_ids):
+    """Read all `question_<id>` fields in one pass over the submitted form.
+
+    Returns a tuple aligned with question_ids. Missing, non-numeric or
+    unknown answers become UNANSWERED instead of raising.
+    """
+    positions = {question_id: i for i, question_id in enumerate(question_ids)}
+    answers = [UNANSWERED] * len(question_ids)
+    for key, value in form.items():
+        if not key.startswith(FIELD_PREFIX):
+            continue
+        try:
+            position = positions.get(int(key[len(FIELD_PREFIX):]))
+            if position is not None:
+                answers[position] = int(value)
+        except (TypeError, ValueError):
+            continue
+    return tuple(answers)
+
+def percentage(score, total):
+    return int((score / total) * 100) if total > 0 else 0
+
+@lru_cache(maxsize=64)
+def _bit_weights(total):
+    return tuple(1 << i for i in range(total))
+
+def grade(answer_key, answers):
+    """Grade one submission against an answer key of the same length."""
+    return grade_many(answer_key, (answers,))[0]
+
+def grade_many(answer_key, submissions):
+    """Grade many submissions against one answer key.
+
+    Per-question bit weights are shared across the batch, and each
+    submission is compared and folded into its score and bitmap with
+    map/compress so the inner loop stays in C.
+    """
+    total = len(answer_key)
+    weights = _bit_weights(total)
+    results = []
+    for answers in submissions:
+        hits = list(map(eq, answer_key, answers))
+        score = sum(hits)
+        results.append(GradeResult(score, total, percentage(score, total), sum(compress(weights, hits))))
+    return results
+
+def encode_answers(question_ids, answers):
+    """Serialise answers as {question_id: option} for storage with the attempt."""
+    return json.dumps({str(q): a for q, a in zip(question_ids, answers) if a != UNANSWERED},
+                      separators=(',', ':'))
+
+def decode_answers(encoded, question_ids):
+    """Inverse of encode_answers, realigned to the current question_ids."""
+    stored = json.loads(encoded) if encoded else {}
+    return tuple(stored.get(str(q), UNANSWERED) for q in question_ids)
+
+def regrade_quiz_attempts(conn, compiled, batch_size=1000):
+    """Re-grade stored attempts of a quiz against its current answer key.
+
+    Only attempts recorded with their answers can be re-graded. Each batch
+    is committed on its own and the user_quiz_best rows of the quiz are
+    rebuilt afterwards in one short transaction, so other writers are
+    never locked out for the whole run. An interrupted run can simply be
+    repeated: only scores that differ from the current key are updated.
+    Returns the number of attempts whose score changed.
+    """
+    quiz_id = compiled.quiz.id
+    changed = 0
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            "SELECT id, score, answers FROM user_quiz_results "
+            "WHERE quiz_id = ? AND answers IS NOT NULL AND id > ? ORDER BY id LIMIT ?",
+            (quiz_id, last_id, batch_size)
+        ).fetchall()
+        if not rows:
+            break
+        last_id = rows[-1]['id']
+        results = grade_many(compiled.answer_key,
+                             (decode_answers(row['answers'], compiled.question_ids) for row in rows))
+        updates = [(result.percentage, row['id'])
+                   for row, result in zip(rows, results) if result.percentage != row['score']]
+        conn.executemany("UPDATE user_quiz_results SET score = ? WHERE id = ?", updates)
+        conn.commit()
+        changed += len(updates)
+
+    conn.execute("DELETE FROM user_quiz_best WHERE quiz_id = ?", (quiz_id,))
+    conn.execute(
+        """
+        INSERT INTO user_quiz_best (user_id, quiz_id, best_score, attempts, last_attempt_at)
+        SELECT user_id, quiz_id, MAX(score), COUNT(*), MAX(created_at)
+        FROM user_quiz_results WHERE quiz_id = ? GROUP BY user_id, quiz_id
+        """,
+        (quiz_id,)
+    )
+    conn.commit()
+    return changed
+
+@register_job('quiz.regrade', concurrency=1, visibility_timeout=1800)
+def regrade_quiz_job(conn, payload):
+    # Commits per batch, which is safe here because a retried run is idempotent
+    compiled = compile_quiz(conn, payload['quiz_id'])
+    if compiled:
+        regrade_quiz_attempts(conn, compiled)
@@ -0,0 +1,35 @@
+"""
+Cookie-free language selection.
+
+A leading /ar or /en path segment selects the language explicitly. The
+middleware moves it from PATH_INFO to SCRIPT_NAME, so the same routes
+serve both trees and url_for() keeps generated links under the prefix.
+"""
+
+from urllib.parse import urlsplit
+
+LANGUAGE_ENVIRON_KEY = 'cyberport.language'
+
+class LanguagePrefixMiddleware:
+    def __init__(self, wsgi_app, languages):
+        self.wsgi_app = wsgi_app
+        self.prefixes = {'/' + lang: lang for lang in languages}
+
+    def __call__(self, environ, start_response):
+        path = environ.get('PATH_INFO', '')
+        head, sep, rest = path[1:].partition('/')
+        lang = self.prefixes.get('/' + head)
+        if lang:
+            environ['PATH_INFO'] = sep + rest or '/'
+            environ['SCRIPT_NAME'] = environ.get('SCRIPT_NAME', '') + '/' + head
+            environ[LANGUAGE_ENVIRON_KEY] = lang
+        return self.wsgi_app(environ, start_response)
+
+def prefix_language(url, language, languages):
+    """Path and query of `url` re-rooted under /<language>, dropping any existing prefix."""
+    parts = urlsplit(url or '/')
+    path = parts.path or '/'
+    head, sep, rest = path[1:].partition('/')
+    if head in languages:
+        path = sep + rest or '/'
+    return f'/{language}{path}' + (f'?{parts.query}' if parts.query else '')
@@ -0,0 +1,205 @@
+"""
+Durable background jobs stored in the application's SQLite database.
+
+Routes enqueue work with enqueue() on their own connection, so the job is
+committed together with the request's writes. Workers, either threads
+started inside the web process or `flask jobs run`, claim jobs with a
+visibility timeout, retry failures with exponential backoff, and respect
+per-type concurrency limits across all processes.
+"""
+
+import json
+import logging
+import threading
+import time
+import traceback
+from collections import namedtuple
+from models import connect
+
+logger = logging.getLogger(__name__)
+
+JobType = namedtuple('JobType', 'handler concurrency max_attempts visibility_timeout')
+
+# job_type -> JobType, filled by @register_job
+JOB_TYPES = {}
+
+RETRY_BACKOFF_BASE = 5  # seconds, doubled on every failed attempt
+RETRY_BACKOFF_MAX = 3600
+
+def register_job(job_type, concurrency=1, max_attempts=5, visibility_timeout=300):
+    """Decorator registering handler(conn, payload) for a job type.
+
+    The handler runs inside a transaction on the worker's connection and
+    normally does not commit; long handlers may commit in batches if a
+    retry after a partial run is harmless. Raising marks the attempt as
+    failed.
+    """
+    def decorator(handler):
+        JOB_TYPES[job_type] = JobType(handler, concurrency, max_attempts, visibility_timeout)
+        return handler
+    return decorator
+
+def enqueue(conn, job_type, payload=None, delay=0):
+    """Queue a job on the caller's connection. Caller commits."""
+    if job_type not in JOB_TYPES:
+        raise ValueError(f'Unknown job type: {job_type}')
+    cursor = conn.execute(
+        "INSERT INTO jobs (job_type, payload, max_attempts, run_at) VALUES (?, ?, ?, ?)",
+        (job_type, json.dumps(payload or {}), JOB_TYPES[job_type].max_attempts, time.time() + delay)
+    )
+    return cursor.lastrowid
+
+def claim_job(conn):
+    """Atomically take the next runnable job, or return None.
+
+    Runnable means queued and due, or running with an expired visibility
+    timeout (its worker died). Types already at their concurrency limit
+    are skipped.
+    """
+    now = time.time()
+    # Cheap read first so idle workers do not take the write lock on every poll
+    if conn.execute(
+        "SELECT 1 FROM jobs WHERE (status = 'queued' AND run_at <= ?) OR (status = 'running' AND locked_until <= ?) LIMIT 1",
+        (now, now)
+    ).fetchone() is None:
+        return None
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        running = dict(conn.execute(
+            "SELECT job_type, COUNT(*) FROM jobs WHERE status = 'running' AND locked_until > ? GROUP BY job_type",
+            (now,)
+        ).fetchall())
+        available = [job_type for job_type, spec in JOB_TYPES.items()
+                     if running.get(job_type, 0) < spec.concurrency]
+        if not available:
+            conn.rollback()
+            return None
+        placeholders = ', '.join('?' for _ in available)
+        job = conn.execute(
+            f"""
+            SELECT * FROM jobs
+            WHERE job_type IN ({placeholders})
+              AND ((status = 'queued' AND run_at <= ?) OR (status = 'running' AND locked_until <= ?))
+            ORDER BY run_at, id LIMIT 1
+            """,
+            (*available, now, now)
+        ).fetchone()
+        if job is None:
+            conn.rollback()
+            return None
+        conn.execute(
+            "UPDATE jobs SET status = 'running', attempts = attempts + 1, locked_until = ?, "
+            "updated_at = CURRENT_TIMESTAMP WHERE id = ?",
+            (now + JOB_TYPES[job['job_type']].visibility_timeout, job['id'])
+        )
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return job
+
+def run_job(conn, job):
+    """Run a claimed job and record its outcome. Returns True on success."""
+    spec = JOB_TYPES[job['job_type']]
+    try:
+        spec.handler(conn, json.loads(job['payload']))
+        conn.execute("DELETE FROM jobs WHERE id = ?", (job['id'],))
+        conn.commit()
+        return True
+    except Exception:
+        conn.rollback()
+        attempts = job['attempts'] + 1
+        error = traceback.format_exc(limit=5)
+        if attempts >= job['max_attempts']:
+            logger.error("Job %s (%s) failed permanently", job['id'], job['job_type'])
+            conn.execute(
+                "UPDATE jobs SET status = 'failed', last_error = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?",
+                (error, job['id'])
+            )
+        else:
+            delay = min(RETRY_BACKOFF_BASE * 2 ** (attempts - 1), RETRY_BACKOFF_MAX)
+            logger.warning("Job %s (%s) failed, retrying in %ss", job['id'], job['job_type'], delay)
+            conn.execute(
+                "UPDATE jobs SET status = 'queued', run_at = ?, last_error = ?, updated_at = CURRENT_TIMESTAMP "
+                "WHERE id = ?",
+                (time.time() + delay, error, job['id'])
+            )
+        conn.commit()
+        return False
+
+class JobWorker:
+    """Pool of threads that claim and run jobs until stopped."""
+
+    def __init__(self, database=None, threads=1, poll_interval=1.0):
+        self.database = database
+        self.threads = threads
+        self.poll_interval = poll_interval
+        self._stop = threading.Event()
+        self._start_lock = threading.Lock()
+        self._threads = []
+
+    def start(self):
+        """Start the worker threads, replacing any that died; a no-op while all are alive."""
+        with self._start_lock:
+            if self._stop.is_set():
+                return
+            alive = [thread for thread in self._threads if thread.is_alive()]
+            if len(alive) == len(self._threads) == self.threads:
+                return
+            names = {thread.name for thread in alive}
+            for i in range(self.threads):
+                name = f'job-worker-{i}'
+                if name in names:
+                    continue
+                if self._threads:
+                    logger.warning("Restarting job worker thread %s", name)
+                thread = threading.Thread(target=self._loop, name=name, daemon=True)
+                thread.start()
+                alive.append(thread)
+            self._threads = alive
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def run_until_empty(self):
+        """Run jobs on the calling thread until none is runnable. Returns the number run."""
+        conn = connect(self.database)
+        count = 0
+        try:
+            while not self._stop.is_set():
+                job = claim_job(conn)
+                if job is None:
+                    break
+                run_job(conn, job)
+                count += 1
+        finally:
+            conn.close()
+        return count
+
+    def _loop(self):
+        conn = connect(self.database)
+        try:
+            while not self._stop.is_set():
+                try:
+                    job = claim_job(conn)
+                except Exception:
+                    logger.exception("Failed to claim a job")
+                    job = None
+                if job is None:
+                    self._stop.wait(self.poll_interval)
+                    continue
+                try:
+                    run_job(conn, job)
+                except Exception:
+                    # Recording the outcome failed (e.g. database is locked); the job
+                    # stays claimed and is picked up again after its visibility timeout.
+                    logger.exception("Failed to record the outcome of job %s", job['id'])
+                    try:
+                        conn.rollback()
+                    except Exception:
+                        logger.exception("Failed to roll back after job %s", job['id'])
+                    self._stop.wait(self.poll_interval)
+        finally:
+            conn.close()
@@ -0,0 +1,157 @@
+"""
+Request latency and SQL statistics in Prometheus text format.
+
+Every statement run on a request's pooled connection is timed (see
+models.query_observers for what that time covers) into a QueryStats
+object on `g`. When the request
+finishes, its latency, status and SQL totals are added to an in-memory
+buffer that a background thread periodically adds to the metrics tables,
+so /metrics reports the sum over all gunicorn workers rather than
+whichever worker happened to answer the scrape.
+"""
+
+import json
+from flask import g, has_request_context
+from write_behind import WriteBehindBuffer
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+# family -> (type, help)
+FAMILIES = {
+    'http_requests_total': ('counter', 'Requests handled, by endpoint, method and status.'),
+    'http_request_duration_seconds': ('histogram', 'Request latency by endpoint.'),
+    'sql_queries_per_request': ('histogram', 'SQL statements run per request, by endpoint.'),
+    'sql_duration_seconds_total': ('counter', 'Time spent executing SQL statements up to their first row, '
+                                               'by endpoint.'),
+    'sql_slowest_statement_seconds': ('gauge', 'Slowest SQL statement seen for each endpoint, '
+                                               'timed up to its first row.'),
+}
+
+class QueryStats:
+    """SQL statements run during one request."""
+    __slots__ = ('count', 'seconds', 'slowest_seconds', 'slowest_sql')
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.slowest_seconds = 0.0
+        self.slowest_sql = None
+
+    def record(self, sql, seconds):
+        self.count += 1
+        self.seconds += seconds
+        if seconds >= self.slowest_seconds:
+            self.slowest_seconds = seconds
+            self.slowest_sql = sql
+
+def record_query(conn, sql, parameters, seconds):
+    """models.query_observers hook: attribute a statement to the current request."""
+    stats = g.get('query_stats') if has_request_context() else None
+    if stats is not None:
+        stats.record(sql, seconds)
+
+def _format_labels(labels):
+    return ','.join(f'{name}="{_escape(value)}"' for name, value in labels)
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+def _format_value(value):
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+class Metrics(WriteBehindBuffer):
+    """Per-worker buffer of request and SQL metrics, added to the database in batches."""
+    thread_name = 'metrics-flush'
+    description = 'metrics'
+
+    def __init__(self, flush_interval=15, database=None):
+        super().__init__(flush_interval, database)
+        self._pending = {}  # (name, labels) -> increment
+        self._slowest = {}  # endpoint -> (seconds, sql)
+
+    def observe_request(self, endpoint, method, status, seconds, stats):
+        endpoint = endpoint or 'none'
+        with self._lock:
+            self._add('http_requests_total', (('endpoint', endpoint), ('method', method), ('status', str(status))), 1)
+            self._add_histogram('http_request_duration_seconds', endpoint, LATENCY_BUCKETS, seconds)
+            if stats is not None:
+                self._add_histogram('sql_queries_per_request', endpoint, QUERY_COUNT_BUCKETS, stats.count)
+                self._add('sql_duration_seconds_total', (('endpoint', endpoint),), stats.seconds)
+                if stats.slowest_sql is not None and stats.slowest_seconds > self._slowest.get(endpoint, (0,))[0]:
+                    self._slowest[endpoint] = (stats.slowest_seconds, stats.slowest_sql)
+        self._ensure_timer()
+
+    def _add(self, name, labels, amount):
+        key = (name, labels)
+        self._pending[key] = self._pending.get(key, 0) + amount
+
+    def _add_histogram(self, family, endpoint, buckets, value):
+        # Buckets are cumulative, as Prometheus expects them
+        for bound in buckets:
+            if value <= bound:
+                self._add(f'{family}_bucket', (('endpoint', endpoint), ('le', repr(float(bound)))), 1)
+        self._add(f'{family}_bucket', (('endpoint', endpoint), ('le', '+Inf')), 1)
+        self._add(f'{family}_sum', (('endpoint', endpoint),), value)
+        self._add(f'{family}_count', (('endpoint', endpoint),), 1)
+
+    def _take(self):
+        if not self._pending and not self._slowest:
+            return None
+        batch = (self._pending, self._slowest)
+        self._pending, self._slowest = {}, {}
+        return batch
+
+    def _write(self, conn, batch):
+        pending, slowest = batch
+        conn.executemany(
+            "INSERT INTO metrics (name, labels, value) VALUES (?, ?, ?) "
+            "ON CONFLICT (name, labels) DO UPDATE SET value = value + excluded.value",
+            [(name, json.dumps(labels), value) for (name, labels), value in pending.items()]
+        )
+        conn.executemany(
+            "INSERT INTO metrics_slowest_statements (endpoint, seconds, statement) VALUES (?, ?, ?) "
+            "ON CONFLICT (endpoint) DO UPDATE SET seconds = excluded.seconds, "
+            "statement = excluded.statement WHERE excluded.seconds > seconds",
+            [(endpoint, seconds, sql) for endpoint, (seconds, sql) in slowest.items()]
+        )
+        return len(pending) + len(slowest)
+
+    def _restore(self, batch):
+        pending, slowest = batch
+        for key, value in pending.items():
+            self._pending[key] = self._pending.get(key, 0) + value
+        for endpoint, entry in slowest.items():
+            if entry[0] > self._slowest.get(endpoint, (0,))[0]:
+                self._slowest[endpoint] = entry
+
+    def render(self, conn):
+        """All workers' metrics in Prometheus text exposition format."""
+        self.flush()
+        samples = {}
+        for row in conn.execute("SELECT name, labels, value FROM metrics"):
+            labels = tuple(tuple(pair) for pair in json.loads(row['labels']))
+            family = next(f for f in FAMILIES if row['name'] == f or row['name'].startswith(f + '_'))
+            samples.setdefault(family, []).append((row['name'], labels, row['value']))
+        for row in conn.execute("SELECT endpoint, seconds, statement FROM metrics_slowest_statements"):
+            samples.setdefault('sql_slowest_statement_seconds', []).append(
+                ('sql_slowest_statement_seconds',
+                 (('endpoint', row['endpoint']), ('statement', ' '.join(row['statement'].split()))),
+                 row['seconds'])
+            )
+
+        lines = []
+        for family, (kind, help_text) in FAMILIES.items():
+            if family not in samples:
+                continue
+            lines += [f'# HELP {family} {help_text}', f'# TYPE {family} {kind}']
+            for name, labels, value in sorted(samples[family], key=_sample_order):
+                lines.append(f'{name}{{{_format_labels(labels)}}} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+def _sample_order(sample):
+    # Group each histogram's series by endpoint, buckets in ascending order before _sum and _count
+    name, labels, _ = sample
+    rest = tuple(pair for pair in labels if pair[0] != 'le')
+    le = dict(labels).get('le')
+    return (rest, le is None, float(le) if le is not None else 0, name)
@@ -1,14 +1,125 @@
 import sqlite3
-from werkzeug.security import generate_password_hash, check_password_hash
+import threading
+import time
+from flask import g, has_app_context, current_app
 from datetime import datetime
+from config import Config
+from passwords import PasswordHasher
 
-DATABASE = 'database.sqlite'
+DATABASE = Config.DATABASE
 
-def get_db_connection():
-    conn = sqlite3.connect(DATABASE)
+password_hasher = PasswordHasher(
+    method=Config.PASSWORD_HASH_METHOD,
+    max_workers=Config.PASSWORD_HASH_WORKERS,
+    max_pending=Config.PASSWORD_HASH_MAX_PENDING,
+    queue_timeout=Config.PASSWORD_HASH_QUEUE_TIMEOUT,
+)
+
+# One long-lived connection per worker thread, handed out per request via `g`.
+_local = threading.local()
+
+# Callables (conn, sql, parameters, seconds) notified after every statement
+# run through execute()/executemany() on a pooled connection. `seconds` is
+# the time spent inside that call: preparing the statement and stepping it
+# to its first row (all rows for writes). Rows fetched later from the
+# cursor are not included; a streamed export, for instance, fetches them
+# after the request's metrics have been recorded.
+query_observers = []
+
+class PooledConnection(sqlite3.Connection):
+    """Connection owned by the per-thread pool.
+
+    Routes still call conn.close() when they are done; for a pooled
+    connection that is a no-op and the connection is released by the
+    request teardown instead.
+    """
+
+    def execute(self, sql, parameters=()):
+        if not query_observers:
+            return super().execute(sql, parameters)
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            self._notify(sql, parameters, time.perf_counter() - start)
+
+    def executemany(self, sql, seq_of_parameters):
+        if not query_observers:
+            return super().executemany(sql, seq_of_parameters)
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            self._notify(sql, None, time.perf_counter() - start)
+
+    def _notify(self, sql, parameters, seconds):
+        for observer in query_observers:
+            observer(self, sql, parameters, seconds)
+
+    def close(self):
+        pass
+
+    def release(self):
+        if self.in_transaction:
+            self.rollback()
+
+    def dispose(self):
+        sqlite3.Connection.close(self)
+
+def _get_setting(name):
+    if has_app_context():
+        return current_app.config.get(name, getattr(Config, name))
+    return getattr(Config, name)
+
+def _configure_connection(conn):
     conn.row_factory = sqlite3.Row
+    conn.execute(f"PRAGMA busy_timeout = {int(_get_setting('SQLITE_BUSY_TIMEOUT'))}")
+    conn.execute(f"PRAGMA journal_mode = {_get_setting('SQLITE_JOURNAL_MODE')}")
+    conn.execute(f"PRAGMA synchronous = {_get_setting('SQLITE_SYNCHRONOUS')}")
+    conn.execute(f"PRAGMA mmap_size = {int(_get_setting('SQLITE_MMAP_SIZE'))}")
+    conn.execute(f"PRAGMA cache_size = {int(_get_setting('SQLITE_CACHE_SIZE'))}")
     return conn
 
+def connect(database=None, factory=sqlite3.Connection):
+    """Open a new tuned connection outside the request pool."""
+    database = database or _get_setting('DATABASE')
+    conn = sqlite3.connect(database, timeout=_get_setting('SQLITE_BUSY_TIMEOUT') / 1000, factory=factory)
+    return _configure_connection(conn)
+
+def _get_thread_connection(database):
+    conn = getattr(_local, 'conn', None)
+    if conn is None or _local.database != database:
+        if conn is not None:
+            conn.dispose()
+        conn = connect(database, factory=PooledConnection)
+        _local.conn = conn
+        _local.database = database
+    return conn
+
+def get_db_connection():
+    """Return the request's database connection.
+
+    Inside a Flask app context the calling thread's pooled connection is
+    returned and cached on `g`, so every call in the same request shares it.
+    Outside an app context (scripts, init_db at import time) a standalone
+    connection is opened and the caller is responsible for closing it.
+    """
+    if not has_app_context():
+        return connect()
+    if 'db' not in g:
+        g.db = _get_thread_connection(current_app.config['DATABASE'])
+    return g.db
+
+def close_db(exception=None):
+    """Teardown hook: hand the request's connection back to the thread pool."""
+    conn = g.pop('db', None)
+    if conn is not None:
+        conn.release()
+
+def init_db_pool(app):
+    """Register the connection teardown on the Flask app."""
+    app.teardown_appcontext(close_db)
+
 def init_db():
     conn = get_db_connection()
     
@@ -116,11 +227,480 @@ def init_db():
     """)
 
     conn.commit()
+    migrate_db(conn)
     conn.close()
 
+EXCERPT_LENGTH = 150
+
+def make_excerpt(content, length=EXCERPT_LENGTH):
+    """Leading slice of an article body shown on the articles list."""
+    return (content or '')[:length]
+
+# --- Schema Migrations ---
+# Each entry is (version, statements). PRAGMA user_version records the last
+# version applied; append new migrations to the end, never edit old ones.
+# Migrations spell out their SQL instead of generating it from live module
+# data (search.ARABIC_NORMALIZATION, stats.STATS_COUNTERS), so editing that
+# data later cannot change what an applied migration did.
+
+# Arabic normalisation indexed by the FTS triggers, as (code point, replacement
+# code point or None to strip): harakat, superscript alef and tatweel removed,
+# alef forms -> alef, alef maqsura -> ya, ta marbuta -> ha.
+_FTS_NORMALIZATION_V6 = (
+    (0x064B, None), (0x064C, None), (0x064D, None), (0x064E, None),
+    (0x064F, None), (0x0650, None), (0x0651, None), (0x0652, None),
+    (0x0670, None), (0x0640, None),
+    (0x0623, 0x0627), (0x0625, 0x0627), (0x0622, 0x0627), (0x0671, 0x0627),
+    (0x0649, 0x064A), (0x0629, 0x0647),
+)
+
+def _fts_normalized_v6(*columns):
+    """Comma-separated SQL expressions applying _FTS_NORMALIZATION_V6 to each column."""
+    expressions = []
+    for expr in columns:
+        for source, target in _FTS_NORMALIZATION_V6:
+            expr = f"replace({expr}, char({source}), {f'char({target})' if target else chr(39) * 2})"
+        expressions.append(expr)
+    return ', '.join(expressions)
+
+MIGRATIONS = [
+    (1, [
+        # my_reports: WHERE user_id = ? ORDER BY created_at DESC
+        "CREATE INDEX IF NOT EXISTS idx_reports_user_created ON reports (user_id, created_at)",
+        # admin_reports: optional status/type filters, ORDER BY created_at DESC
+        "CREATE INDEX IF NOT EXISTS idx_reports_status_type_created ON reports (status, report_type, created_at)",
+        "CREATE INDEX IF NOT EXISTS idx_reports_type_created ON reports (report_type, created_at)",
+        "CREATE INDEX IF NOT EXISTS idx_reports_created ON reports (created_at)",
+        # quizzes: MAX(score) per (user_id, quiz_id)
+        "CREATE INDEX IF NOT EXISTS idx_quiz_results_user_quiz_score ON user_quiz_results (user_id, quiz_id, score)",
+        # take_quiz / admin_quiz_questions
+        "CREATE INDEX IF NOT EXISTS idx_quiz_questions_quiz ON quiz_questions (quiz_id)",
+        "CREATE INDEX IF NOT EXISTS idx_quiz_options_question ON quiz_options (question_id)",
+        # tips / alerts: WHERE type = ? ORDER BY publish_date DESC
+        "CREATE INDEX IF NOT EXISTS idx_tips_alerts_type_date ON tips_alerts (type, publish_date)",
+    ]),
+    (2, [
+        # Per-user best score, maintained by record_quiz_attempt()
+        """
+        CREATE TABLE IF NOT EXISTS user_quiz_best (
+            user_id INTEGER NOT NULL,
+            quiz_id INTEGER NOT NULL,
+            best_score INTEGER NOT NULL,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            last_attempt_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (user_id, quiz_id),
+            FOREIGN KEY (user_id) REFERENCES users (id),
+            FOREIGN KEY (quiz_id) REFERENCES quizzes (id)
+        ) WITHOUT ROWID
+        """,
+        """
+        INSERT OR REPLACE INTO user_quiz_best (user_id, quiz_id, best_score, attempts, last_attempt_at)
+        SELECT user_id, quiz_id, MAX(score), COUNT(*), MAX(created_at)
+        FROM user_quiz_results GROUP BY user_id, quiz_id
+        """,
+    ]),
+    (3, [
+        # Bumped on every admin write to a quiz, its questions or options
+        "ALTER TABLE quizzes ADD COLUMN version INTEGER NOT NULL DEFAULT 0",
+    ]),
+    (4, [
+        # Submitted answers as {question_id: option} JSON, used for re-grading
+        "ALTER TABLE user_quiz_results ADD COLUMN answers TEXT",
+    ]),
+    (5, [
+        # Precomputed list-page excerpts so the articles list never loads full bodies
+        "ALTER TABLE articles ADD COLUMN excerpt_ar TEXT NOT NULL DEFAULT ''",
+        "ALTER TABLE articles ADD COLUMN excerpt_en TEXT NOT NULL DEFAULT ''",
+        # The EXCERPT_LENGTH of the time, frozen like the rest of this migration
+        "UPDATE articles SET excerpt_ar = substr(content_ar, 1, 150), excerpt_en = substr(content_en, 1, 150)",
+        # articles: WHERE is_published = 1 ORDER BY created_at DESC, id DESC
+        "CREATE INDEX IF NOT EXISTS idx_articles_published_created ON articles (is_published, created_at, id)",
+    ]),
+    # FTS5 indexes over articles and tips_alerts, kept in sync by triggers
+    (6, [
+        "CREATE VIRTUAL TABLE IF NOT EXISTS articles_fts USING fts5(title_ar, title_en, content_ar, content_en, "
+        "tokenize = 'unicode61')",
+        f"""
+        CREATE TRIGGER IF NOT EXISTS articles_fts_ai AFTER INSERT ON articles BEGIN
+            INSERT INTO articles_fts (rowid, title_ar, title_en, content_ar, content_en)
+            VALUES (new.id, {_fts_normalized_v6('new.title_ar', 'new.title_en', 'new.content_ar', 'new.content_en')});
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS articles_fts_ad AFTER DELETE ON articles BEGIN
+            DELETE FROM articles_fts WHERE rowid = old.id;
+        END
+        """,
+        # Only text columns: view count updates must not touch the index
+        f"""
+        CREATE TRIGGER IF NOT EXISTS articles_fts_au AFTER UPDATE OF title_ar, title_en, content_ar, content_en
+        ON articles BEGIN
+            DELETE FROM articles_fts WHERE rowid = old.id;
+            INSERT INTO articles_fts (rowid, title_ar, title_en, content_ar, content_en)
+            VALUES (new.id, {_fts_normalized_v6('new.title_ar', 'new.title_en', 'new.content_ar', 'new.content_en')});
+        END
+        """,
+        "DELETE FROM articles_fts",
+        f"""
+        INSERT INTO articles_fts (rowid, title_ar, title_en, content_ar, content_en)
+        SELECT id, {_fts_normalized_v6('articles.title_ar', 'articles.title_en', 'articles.content_ar',
+                                       'articles.content_en')}
+        FROM articles
+        """,
+        "CREATE VIRTUAL TABLE IF NOT EXISTS tips_alerts_fts USING fts5(content_ar, content_en, tokenize = 'unicode61')",
+        f"""
+        CREATE TRIGGER IF NOT EXISTS tips_alerts_fts_ai AFTER INSERT ON tips_alerts BEGIN
+            INSERT INTO tips_alerts_fts (rowid, content_ar, content_en)
+            VALUES (new.id, {_fts_normalized_v6('new.content_ar', 'new.content_en')});
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS tips_alerts_fts_ad AFTER DELETE ON tips_alerts BEGIN
+            DELETE FROM tips_alerts_fts WHERE rowid = old.id;
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS tips_alerts_fts_au AFTER UPDATE OF content_ar, content_en ON tips_alerts BEGIN
+            DELETE FROM tips_alerts_fts WHERE rowid = old.id;
+            INSERT INTO tips_alerts_fts (rowid, content_ar, content_en)
+            VALUES (new.id, {_fts_normalized_v6('new.content_ar', 'new.content_en')});
+        END
+        """,
+        "DELETE FROM tips_alerts_fts",
+        f"""
+        INSERT INTO tips_alerts_fts (rowid, content_ar, content_en)
+        SELECT id, {_fts_normalized_v6('tips_alerts.content_ar', 'tips_alerts.content_en')} FROM tips_alerts
+        """,
+    ]),
+    (7, [
+        # admin_reports: status filter alone, newest first
+        "CREATE INDEX IF NOT EXISTS idx_reports_status_created ON reports (status, created_at)",
+    ]),
+    # Trigger-maintained row counts for the admin dashboard and report filters (see stats.py)
+    (8, [
+        """
+        CREATE TABLE IF NOT EXISTS stats_counters (
+            name TEXT PRIMARY KEY NOT NULL,
+            value INTEGER NOT NULL DEFAULT 0
+        ) WITHOUT ROWID
+        """,
+        "DELETE FROM stats_counters",
+        """
+        CREATE TRIGGER stats_reports_ai AFTER INSERT ON reports BEGIN
+            INSERT INTO stats_counters (name, value) VALUES ('reports', 1) ON CONFLICT (name) DO UPDATE SET value = value + excluded.value;
+            INSERT INTO stats_counters (name, value) VALUES ('reports.status.' || new.status, 1) ON CONFLICT (name) DO UPDATE SET value = value + excluded.value;
+            INSERT INTO stats_counters (name, value) VALUES ('reports.type.' || new.report_type, 1) ON CONFLICT (name) DO UPDATE SET value = value + excluded.value;
+            INSERT INTO stats_counters (name, value) VALUES ('reports.status_type.' || new.status || '|' || new.report_type, 1) ON CONFLICT (name) DO UPDATE SET value = value + excluded.value;
+        END
+        """,
+        """
+        CREATE TRIGGER stats_reports_ad AFTER DELETE ON reports BEGIN
+            INSERT INTO stats_counters (name, value) VALUES ('reports', -1) ON CONFLICT (name) DO UPDATE SET value = value + excluded.value;
+            INSERT INTO stats_counters (name, value) VALUES ('reports.status.' || old.status, -1) ON CONFLICT (name) DO UPDATE SET value = value + excluded.value;
+            INSERT INTO stats_counters (name, value) VALUES ('reports.type.' || old.report_type, -1) ON CONFLICT (name) DO UPDATE SET value = value + excluded.value;
+            INSERT INTO stats_counters (name, value) VALUES ('reports.status_type.' || old.status || '|' || old.report_type, -1) ON CONFLICT (name) DO UPDATE SET value = value + excluded.value;
+        END
+        """,
+        """
+        CREATE TRIGGER stats_reports_au AFTER UPDATE OF report_type, status ON reports BEGIN
+            INSERT INTO stats_counters (name, value) VALUES ('reports.status.' || old.status, -1) ON CONFLICT (name) DO UPDATE SET value = value + excluded.value;
+            INSERT INTO stats_counters (name, value) VALUES ('reports.status.' || new.status, 1) ON CONFLICT (name) DO UPDATE SET value = value + excluded.value;
+            INSERT INTO stats_counters (name, value) VALUES ('reports.type.' || old.report_type, -1) ON CONFLICT (name) DO UPDATE SET value = value + excluded.value;
+            INSERT INTO stats_counters (name, value) VALUES ('reports.type.' || new.report_type, 1) ON CONFLICT (name) DO UPDATE SET value = value + excluded.value;
+            INSERT INTO stats_counters (name, value) VALUES ('reports.status_type.' || old.status || '|' || old.report_type, -1) ON CONFLICT (name) DO UPDATE SET value = value + excluded.value;
+            INSERT INTO stats_counters (name, value) VALUES ('reports.status_type.' || new.status || '|' || new.report_type, 1) ON CONFLICT (name) DO UPDATE SET value = value + excluded.value;
+        END
+        """,
+        "INSERT INTO stats_counters (name, value) SELECT 'reports', COUNT(*) FROM reports",
+        "INSERT INTO stats_counters (name, value) SELECT 'reports.status.' || reports.status, COUNT(*) FROM reports GROUP BY 1",
+        "INSERT INTO stats_counters (name, value) SELECT 'reports.type.' || reports.report_type, COUNT(*) FROM reports GROUP BY 1",
+        "INSERT INTO stats_counters (name, value) SELECT 'reports.status_type.' || reports.status || '|' || reports.report_type, COUNT(*) FROM reports GROUP BY 1",
+        """
+        CREATE TRIGGER stats_users_ai AFTER INSERT ON users BEGIN
+            INSERT INTO stats_counters (name, value) VALUES ('users', 1) ON CONFLICT (name) DO UPDATE SET value = value + excluded.value;
+            INSERT INTO stats_counters (name, value) VALUES ('users.role.' || new.role, 1) ON CONFLICT (name) DO UPDATE SET value = value + excluded.value;
+            INSERT INTO stats_counters (name, value) VALUES ('users.department.' || coalesce(new.department, ''), 1) ON CONFLICT (name) DO UPDATE SET value = value + excluded.value;
+        END
+        """,
+        """
+        CREATE TRIGGER stats_users_ad AFTER DELETE ON users BEGIN
+            INSERT INTO stats_counters (name, value) VALUES ('users', -1) ON CONFLICT (name) DO UPDATE SET value = value + excluded.value;
+            INSERT INTO stats_counters (name, value) VALUES ('users.role.' || old.role, -1) ON CONFLICT (name) DO UPDATE SET value = value + excluded.value;
+            INSERT INTO stats_counters (name, value) VALUES ('users.department.' || coalesce(old.department, ''), -1) ON CONFLICT (name) DO UPDATE SET value = value + excluded.value;
+        END
+        """,
+        """
+        CREATE TRIGGER stats_users_au AFTER UPDATE OF department, role ON users BEGIN
+            INSERT INTO stats_counters (name, value) VALUES ('users.role.' || old.role, -1) ON CONFLICT (name) DO UPDATE SET value = value + excluded.value;
+            INSERT INTO stats_counters (name, value) VALUES ('users.role.' || new.role, 1) ON CONFLICT (name) DO UPDATE SET value = value + excluded.value;
+            INSERT INTO stats_counters (name, value) VALUES ('users.department.' || coalesce(old.department, ''), -1) ON CONFLICT (name) DO UPDATE SET value = value + excluded.value;
+            INSERT INTO stats_counters (name, value) VALUES ('users.department.' || coalesce(new.department, ''), 1) ON CONFLICT (name) DO UPDATE SET value = value + excluded.value;
+        END
+        """,
+        "INSERT INTO stats_counters (name, value) SELECT 'users', COUNT(*) FROM users",
+        "INSERT INTO stats_counters (name, value) SELECT 'users.role.' || users.role, COUNT(*) FROM users GROUP BY 1",
+        "INSERT INTO stats_counters (name, value) SELECT 'users.department.' || coalesce(users.department, ''), COUNT(*) FROM users GROUP BY 1",
+        """
+        CREATE TRIGGER stats_articles_ai AFTER INSERT ON articles BEGIN
+            INSERT INTO stats_counters (name, value) VALUES ('articles', 1) ON CONFLICT (name) DO UPDATE SET value = value + excluded.value;
+        END
+        """,
+        """
+        CREATE TRIGGER stats_articles_ad AFTER DELETE ON articles BEGIN
+            INSERT INTO stats_counters (name, value) VALUES ('articles', -1) ON CONFLICT (name) DO UPDATE SET value = value + excluded.value;
+        END
+        """,
+        "INSERT INTO stats_counters (name, value) SELECT 'articles', COUNT(*) FROM articles",
+        """
+        CREATE TRIGGER stats_quizzes_ai AFTER INSERT ON quizzes BEGIN
+            INSERT INTO stats_counters (name, value) VALUES ('quizzes', 1) ON CONFLICT (name) DO UPDATE SET value = value + excluded.value;
+        END
+        """,
+        """
+        CREATE TRIGGER stats_quizzes_ad AFTER DELETE ON quizzes BEGIN
+            INSERT INTO stats_counters (name, value) VALUES ('quizzes', -1) ON CONFLICT (name) DO UPDATE SET value = value + excluded.value;
+        END
+        """,
+        "INSERT INTO stats_counters (name, value) SELECT 'quizzes', COUNT(*) FROM quizzes",
+    ]),
+    (9, [
+        # Bumped whenever a user's role or active flag changes; sessions carry
+        # the version they logged in with (see auth_cache.py)
+        "ALTER TABLE users ADD COLUMN auth_version INTEGER NOT NULL DEFAULT 0",
+        """
+        CREATE TRIGGER IF NOT EXISTS users_auth_version_au AFTER UPDATE OF role, is_active ON users
+        WHEN old.role IS NOT new.role OR old.is_active IS NOT new.is_active
+        BEGIN
+            UPDATE users SET auth_version = auth_version + 1 WHERE id = new.id;
+        END
+        """,
+    ]),
+    (10, [
+        # Content-addressed report attachments, shared by reports with identical files
+        """
+        CREATE TABLE IF NOT EXISTS attachments (
+            sha256 TEXT PRIMARY KEY,
+            file_path TEXT NOT NULL, -- Relative to UPLOAD_FOLDER, e.g. 'ab/cd/<sha256>.pdf'
+            mime_type TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+        ) WITHOUT ROWID
+        """,
+        "ALTER TABLE reports ADD COLUMN attachment_sha256 TEXT REFERENCES attachments (sha256)",
+    ]),
+    (11, [
+        # Background job queue (see jobs.py); run_at/locked_until are unix timestamps
+        """
+        CREATE TABLE IF NOT EXISTS jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            job_type TEXT NOT NULL,
+            payload TEXT NOT NULL DEFAULT '{}', -- JSON
+            status TEXT NOT NULL DEFAULT 'queued', -- 'queued', 'running', 'failed'
+            attempts INTEGER NOT NULL DEFAULT 0,
+            max_attempts INTEGER NOT NULL DEFAULT 5,
+            run_at REAL NOT NULL,
+            locked_until REAL,
+            last_error TEXT,
+            created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_jobs_status_run_at ON jobs (status, run_at)",
+        "CREATE INDEX IF NOT EXISTS idx_jobs_status_locked ON jobs (status, locked_until)",
+    ]),
+    (12, [
+        # Per-section content versions validating cached pages (see page_cache.py)
+        """
+        CREATE TABLE IF NOT EXISTS content_versions (
+            name TEXT PRIMARY KEY NOT NULL,
+            version INTEGER NOT NULL DEFAULT 0
+        ) WITHOUT ROWID
+        """,
+        "INSERT OR IGNORE INTO content_versions (name) VALUES ('articles'), ('tips_alerts')",
+    ]),
+    (13, [
+        # Last-Modified of cached listings; covers deletes, which MAX(updated_at) cannot see
+        "ALTER TABLE content_versions ADD COLUMN updated_at TIMESTAMP",
+        "UPDATE content_versions SET updated_at = CURRENT_TIMESTAMP",
+    ]),
+    (14, [
+        # External keys for idempotent bulk imports (see content_import.py)
+        *(stmt for table in ('articles', 'tips_alerts', 'quizzes', 'quiz_questions') for stmt in (
+            f"ALTER TABLE {table} ADD COLUMN external_key TEXT",
+            f"CREATE UNIQUE INDEX IF NOT EXISTS idx_{table}_external_key ON {table} (external_key) "
+            "WHERE external_key IS NOT NULL",
+        )),
+    ]),
+    (15, [
+        # Request and SQL metrics summed over all workers (see metrics.py)
+        """
+        CREATE TABLE IF NOT EXISTS metrics (
+            name TEXT NOT NULL,
+            labels TEXT NOT NULL,
+            value REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY (name, labels)
+        ) WITHOUT ROWID
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS metrics_slowest_statements (
+            endpoint TEXT PRIMARY KEY NOT NULL,
+            seconds REAL NOT NULL,
+            statement TEXT NOT NULL
+        ) WITHOUT ROWID
+        """,
+    ]),
+    (16, [
+        # Slow statements, one row per normalised SQL and query plan (see slow_queries.py)
+        """
+        CREATE TABLE IF NOT EXISTS slow_queries (
+            fingerprint TEXT PRIMARY KEY NOT NULL,
+            sql TEXT NOT NULL,
+            plan TEXT NOT NULL,
+            full_scan INTEGER NOT NULL DEFAULT 0,
+            params_shape TEXT,
+            endpoint TEXT,
+            calls INTEGER NOT NULL DEFAULT 0,
+            total_seconds REAL NOT NULL DEFAULT 0,
+            max_seconds REAL NOT NULL DEFAULT 0,
+            first_seen TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            last_seen TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        ) WITHOUT ROWID
+        """,
+    ]),
+    (17, [
+        # External-content FTS: the index holds normalised text for matching,
+        # while snippet() reads the original columns so results show the text
+        # as written. Combining marks are token characters so both versions
+        # tokenize to the same positions.
+        *(f"DROP TRIGGER IF EXISTS {fts}_{event}"
+          for fts in ('articles_fts', 'tips_alerts_fts') for event in ('ai', 'ad', 'au')),
+        "DROP TABLE IF EXISTS articles_fts",
+        "DROP TABLE IF EXISTS tips_alerts_fts",
+        """
+        CREATE VIRTUAL TABLE articles_fts USING fts5(
+            title_ar, title_en, content_ar, content_en,
+            content = 'articles', content_rowid = 'id',
+            tokenize = "unicode61 categories 'L* N* Co M*'"
+        )
+        """,
+        f"""
+        CREATE TRIGGER articles_fts_ai AFTER INSERT ON articles BEGIN
+            INSERT INTO articles_fts (rowid, title_ar, title_en, content_ar, content_en)
+            VALUES (new.id, {_fts_normalized_v6('new.title_ar', 'new.title_en', 'new.content_ar', 'new.content_en')});
+        END
+        """,
+        f"""
+        CREATE TRIGGER articles_fts_ad AFTER DELETE ON articles BEGIN
+            INSERT INTO articles_fts (articles_fts, rowid, title_ar, title_en, content_ar, content_en)
+            VALUES ('delete', old.id,
+                    {_fts_normalized_v6('old.title_ar', 'old.title_en', 'old.content_ar', 'old.content_en')});
+        END
+        """,
+        # Only text columns: view count updates must not touch the index
+        f"""
+        CREATE TRIGGER articles_fts_au AFTER UPDATE OF title_ar, title_en, content_ar, content_en
+        ON articles BEGIN
+            INSERT INTO articles_fts (articles_fts, rowid, title_ar, title_en, content_ar, content_en)
+            VALUES ('delete', old.id,
+                    {_fts_normalized_v6('old.title_ar', 'old.title_en', 'old.content_ar', 'old.content_en')});
+            INSERT INTO articles_fts (rowid, title_ar, title_en, content_ar, content_en)
+            VALUES (new.id, {_fts_normalized_v6('new.title_ar', 'new.title_en', 'new.content_ar', 'new.content_en')});
+        END
+        """,
+        f"""
+        INSERT INTO articles_fts (rowid, title_ar, title_en, content_ar, content_en)
+        SELECT id, {_fts_normalized_v6('articles.title_ar', 'articles.title_en', 'articles.content_ar',
+                                       'articles.content_en')}
+        FROM articles
+        """,
+        """
+        CREATE VIRTUAL TABLE tips_alerts_fts USING fts5(
+            content_ar, content_en,
+            content = 'tips_alerts', content_rowid = 'id',
+            tokenize = "unicode61 categories 'L* N* Co M*'"
+        )
+        """,
+        f"""
+        CREATE TRIGGER tips_alerts_fts_ai AFTER INSERT ON tips_alerts BEGIN
+            INSERT INTO tips_alerts_fts (rowid, content_ar, content_en)
+            VALUES (new.id, {_fts_normalized_v6('new.content_ar', 'new.content_en')});
+        END
+        """,
+        f"""
+        CREATE TRIGGER tips_alerts_fts_ad AFTER DELETE ON tips_alerts BEGIN
+            INSERT INTO tips_alerts_fts (tips_alerts_fts, rowid, content_ar, content_en)
+            VALUES ('delete', old.id, {_fts_normalized_v6('old.content_ar', 'old.content_en')});
+        END
+        """,
+        f"""
+        CREATE TRIGGER tips_alerts_fts_au AFTER UPDATE OF content_ar, content_en ON tips_alerts BEGIN
+            INSERT INTO tips_alerts_fts (tips_alerts_fts, rowid, content_ar, content_en)
+            VALUES ('delete', old.id, {_fts_normalized_v6('old.content_ar', 'old.content_en')});
+            INSERT INTO tips_alerts_fts (rowid, content_ar, content_en)
+            VALUES (new.id, {_fts_normalized_v6('new.content_ar', 'new.content_en')});
+        END
+        """,
+        f"""
+        INSERT INTO tips_alerts_fts (rowid, content_ar, content_en)
+        SELECT id, {_fts_normalized_v6('tips_alerts.content_ar', 'tips_alerts.content_en')} FROM tips_alerts
+        """,
+    ]),
+    (18, [
+        # Outcome of the background attachment scan (see attachments.scan_attachment_job):
+        # 'pending', 'clean' or 'rejected'. Files stored before scanning existed stay 'pending'.
+        "ALTER TABLE attachments ADD COLUMN scan_status TEXT NOT NULL DEFAULT 'pending'",
+        "ALTER TABLE attachments ADD COLUMN scanned_at TIMESTAMP",
+    ]),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+def get_schema_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+def migrate_db(conn=None):
+    """Apply pending migrations in place and refresh planner statistics.
+
+    Each migration runs in its own write transaction together with the
+    user_version bump, so concurrent workers starting at the same time
+    apply it exactly once. Returns the list of versions applied.
+    """
+    own_conn = conn is None
+    if own_conn:
+        conn = connect()
+    applied = []
+    try:
+        for version, statements in MIGRATIONS:
+            if get_schema_version(conn) >= version:
+                continue
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Re-check under the write lock: another worker may have won.
+                if get_schema_version(conn) >= version:
+                    conn.rollback()
+                    continue
+                for statement in statements:
+                    if callable(statement):
+                        statement(conn)
+                    else:
+                        conn.execute(statement)
+                conn.execute(f"PRAGMA user_version = {int(version)}")
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            applied.append(version)
+        if applied:
+            conn.execute("ANALYZE")
+            conn.commit()
+    finally:
+        if own_conn:
+            conn.close()
+    return applied
+
 def create_user(full_name, email, password, department=None, job_role=None, role='user'):
+    password_hash = password_hasher.hash(password)
     conn = get_db_connection()
-    password_hash = generate_password_hash(password)
     try:
         conn.execute(
             "INSERT INTO users (full_name, email, password_hash, department, job_role, role) VALUES (?, ?, ?, ?, ?, ?)",
@@ -139,9 +719,51 @@ def get_user_by_email(email):
     conn.close()
     return user
 
+def record_quiz_attempt(conn, user_id, quiz_id, score, answers=None):
+    """Store a quiz attempt and fold it into the user's best score. Caller commits."""
+    conn.execute(
+        "INSERT INTO user_quiz_results (user_id, quiz_id, score, answers) VALUES (?, ?, ?, ?)",
+        (user_id, quiz_id, score, answers)
+    )
+    conn.execute(
+        """
+        INSERT INTO user_quiz_best (user_id, quiz_id, best_score, attempts, last_attempt_at)
+        VALUES (?, ?, ?, 1, CURRENT_TIMESTAMP)
+        ON CONFLICT (user_id, quiz_id) DO UPDATE SET
+            best_score = MAX(best_score, excluded.best_score),
+            attempts = attempts + 1,
+            last_attempt_at = excluded.last_attempt_at
+        """,
+        (user_id, quiz_id, score)
+    )
+
+def get_user_best_scores(conn, user_id):
+    """Return {quiz_id: row} of best_score/attempts/last_attempt_at for a user."""
+    rows = conn.execute(
+        "SELECT quiz_id, best_score, attempts, last_attempt_at FROM user_quiz_best WHERE user_id = ?",
+        (user_id,)
+    ).fetchall()
+    return {row['quiz_id']: row for row in rows}
+
+def get_user_auth(user_id):
+    conn = get_db_connection()
+    user = conn.execute("SELECT role, is_active, auth_version FROM users WHERE id = ?", (user_id,)).fetchone()
+    conn.close()
+    return user
+
 def check_password(user, password):
-    return check_password_hash(user['password_hash'], password)
+    return password_hasher.verify(user['password_hash'], password)
+
+def rehash_password_if_needed(user, password):
+    """Re-hash a just-verified password stored with outdated parameters."""
+    if not password_hasher.needs_rehash(user['password_hash']):
+        return False
+    conn = get_db_connection()
+    conn.execute("UPDATE users SET password_hash = ? WHERE id = ?", (password_hasher.hash(password), user['id']))
+    conn.commit()
+    conn.close()
+    return True
 
 if __name__ == '__main__':
     init_db()
-    print("Database schema initialized.")
+    print(f"Database schema initialized (version {SCHEMA_VERSION}).")
@@ -0,0 +1,95 @@
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from datetime import datetime, timezone
+
+PageEntry = namedtuple('PageEntry', 'body versions expires')
+# versions: tuple aligned with the requested sections; last_modified: aware datetime or None
+ContentState = namedtuple('ContentState', 'versions last_modified')
+
+def parse_timestamp(value):
+    """SQLite CURRENT_TIMESTAMP text (UTC) to an aware datetime."""
+    if not value:
+        return None
+    return datetime.strptime(value[:19], '%Y-%m-%d %H:%M:%S').replace(tzinfo=timezone.utc)
+
+class PageCache:
+    """Per-worker LRU cache of rendered pages, bounded by total body size.
+
+    Entries are validated against content_versions, which admin writes bump
+    through invalidate(), so an edit made in one worker retires the cached
+    pages of every worker on their next lookup. The TTL bounds how stale
+    incidental data such as view counts can get.
+    """
+
+    def __init__(self, max_bytes, ttl):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def content_state(self, conn, sections):
+        """Current versions of `sections` and when any of them last changed."""
+        if not sections:
+            return ContentState((), None)
+        placeholders = ', '.join('?' for _ in sections)
+        rows = {row['name']: row for row in conn.execute(
+            f"SELECT name, version, updated_at FROM content_versions WHERE name IN ({placeholders})",
+            list(sections)
+        )}
+        versions = tuple(rows[section]['version'] if section in rows else 0 for section in sections)
+        updated = [row['updated_at'] for row in rows.values() if row['updated_at']]
+        return ContentState(versions, parse_timestamp(max(updated)) if updated else None)
+
+    def get(self, key, versions):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.versions != versions or entry.expires <= time.monotonic():
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry.body
+
+    def put(self, key, versions, body):
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._size -= len(old.body)
+            self._entries[key] = PageEntry(body, versions, time.monotonic() + self.ttl)
+            self._size += len(body)
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted.body)
+                self.evictions += 1
+
+    def invalidate(self, conn, *sections):
+        """Bump the versions of `sections`. Caller commits."""
+        conn.executemany(
+            "UPDATE content_versions SET version = version + 1, updated_at = CURRENT_TIMESTAMP WHERE name = ?",
+            [(section,) for section in sections]
+        )
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._size,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,39 @@
+import base64
+import binascii
+import json
+
+# SQLite integers are signed 64-bit; larger Python ints fail to bind
+_MIN_INT, _MAX_INT = -2 ** 63, 2 ** 63 - 1
+
+def encode_cursor(*values):
+    """Encode the sort key of the last row on a page as an opaque URL token."""
+    raw = json.dumps(values, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def decode_cursor(token, size):
+    """Decode a token from encode_cursor(). Returns None if it is missing or malformed."""
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        values = json.loads(raw.decode('utf-8'))
+    except (binascii.Error, ValueError, UnicodeDecodeError):
+        return None
+    if not isinstance(values, list) or len(values) != size:
+        return None
+    if not all(_is_bindable(value) for value in values):
+        return None
+    return tuple(values)
+
+def _is_bindable(value):
+    # Cursor values are sort keys: text timestamps or integer ids
+    if isinstance(value, str):
+        return True
+    return isinstance(value, int) and not isinstance(value, bool) and _MIN_INT <= value <= _MAX_INT
+
+def split_page(rows, page_size, key):
+    """Split rows fetched with LIMIT page_size + 1 into (page, next_cursor)."""
+    if len(rows) <= page_size:
+        return rows, None
+    page = rows[:page_size]
+    return page, encode_cursor(*key(page[-1]))
@@ -0,0 +1,43 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from werkzeug.security import generate_password_hash, check_password_hash
+
+class HasherBusy(Exception):
+    """Raised when no hashing slot frees up within the queue timeout."""
+
+class PasswordHasher:
+    """Runs password hashing on a small bounded thread pool.
+
+    At most `max_workers` hashes run at once per process and at most
+    `max_pending` more wait for a slot; beyond that, or after
+    `queue_timeout` seconds, HasherBusy is raised so a login wave is shed
+    instead of stalling every request thread behind the KDF.
+    """
+
+    def __init__(self, method='scrypt', max_workers=2, max_pending=8, queue_timeout=10):
+        self.method = method
+        self.queue_timeout = queue_timeout
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='password-hash')
+        self._slots = threading.BoundedSemaphore(max_workers + max_pending)
+        self._method_prefix = None
+
+    def _run(self, fn, *args):
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            raise HasherBusy()
+        try:
+            return self._executor.submit(fn, *args).result()
+        finally:
+            self._slots.release()
+
+    def hash(self, password):
+        return self._run(generate_password_hash, password, self.method)
+
+    def verify(self, password_hash, password):
+        return self._run(check_password_hash, password_hash, password)
+
+    def needs_rehash(self, password_hash):
+        """True if the stored hash was made with a different algorithm or cost."""
+        if self._method_prefix is None:
+            # Werkzeug fills in default parameters, e.g. 'scrypt' -> 'scrypt:32768:8:1'
+            self._method_prefix = generate_password_hash('', self.method).split('$', 1)[0]
+        return password_hash.split('$', 1)[0] != self._method_prefix
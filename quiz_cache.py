@@ -0,0 +1,102 @@
+import threading
+from collections import namedtuple
+
+Quiz = namedtuple('Quiz', 'id title_ar title_en pass_score created_at')
+Question = namedtuple('Question', 'id question_ar question_en correct_option')
+Option = namedtuple('Option', 'id option_ar option_en')
+# Same shape as the dicts the quiz templates iterate over: item['question'], item['options']
+QuizItem = namedtuple('QuizItem', 'question options')
+
+class CompiledQuiz(namedtuple('CompiledQuiz', 'quiz version items question_ids answer_key')):
+    """Immutable snapshot of a quiz with its questions and options.
+
+    `question_ids` and `answer_key` are parallel tuples: answer_key[i] is the
+    0-based correct option of question_ids[i].
+    """
+    __slots__ = ()
+
+COMPILE_QUERY = """
+    SELECT z.id AS quiz_id, z.title_ar, z.title_en, z.pass_score, z.created_at, z.version,
+           q.id AS question_id, q.question_ar, q.question_en, q.correct_option,
+           o.id AS option_id, o.option_ar, o.option_en
+    FROM quizzes z
+    LEFT JOIN quiz_questions q ON q.quiz_id = z.id
+    LEFT JOIN quiz_options o ON o.question_id = q.id
+    WHERE z.id = ?
+    ORDER BY q.id, o.id
+"""
+
+def compile_quiz(conn, quiz_id):
+    """Build a CompiledQuiz with a single JOIN query, or None if the quiz does not exist."""
+    rows = conn.execute(COMPILE_QUERY, (quiz_id,)).fetchall()
+    if not rows:
+        return None
+    first = rows[0]
+    quiz = Quiz(first['quiz_id'], first['title_ar'], first['title_en'], first['pass_score'], first['created_at'])
+
+    items = []
+    question = None
+    options = []
+    for row in rows:
+        if row['question_id'] is None:
+            continue
+        if question is None or question.id != row['question_id']:
+            if question is not None:
+                items.append(QuizItem(question, tuple(options)))
+            question = Question(row['question_id'], row['question_ar'], row['question_en'], row['correct_option'])
+            options = []
+        if row['option_id'] is not None:
+            options.append(Option(row['option_id'], row['option_ar'], row['option_en']))
+    if question is not None:
+        items.append(QuizItem(question, tuple(options)))
+
+    return CompiledQuiz(
+        quiz=quiz,
+        version=first['version'],
+        items=tuple(items),
+        question_ids=tuple(item.question.id for item in items),
+        answer_key=tuple(item.question.correct_option for item in items),
+    )
+
+class QuizCache:
+    """Per-worker cache of compiled quizzes keyed by quiz_id.
+
+    Entries are validated against quizzes.version, which admin writes bump
+    through invalidate(), so a change made in one worker is picked up by
+    all others on their next lookup.
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, conn, quiz_id):
+        cached = self._entries.get(quiz_id)
+        if cached is not None:
+            row = conn.execute("SELECT version FROM quizzes WHERE id = ?", (quiz_id,)).fetchone()
+            if row is None:
+                self._discard(quiz_id)
+                return None
+            if row['version'] == cached.version:
+                return cached
+
+        compiled = compile_quiz(conn, quiz_id)
+        with self._lock:
+            if compiled is None:
+                self._entries.pop(quiz_id, None)
+            else:
+                self._entries[quiz_id] = compiled
+        return compiled
+
+    def invalidate(self, conn, quiz_id):
+        """Bump the quiz's version and drop the local entry. Caller commits."""
+        conn.execute("UPDATE quizzes SET version = version + 1 WHERE id = ?", (quiz_id,))
+        self._discard(quiz_id)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _discard(self, quiz_id):
+        with self._lock:
+            self._entries.pop(quiz_id, None)
@@ -0,0 +1,72 @@
+import re
+from markupsafe import Markup, escape
+
+# Arabic normalisation applied to both indexed text and queries:
+# strip harakat and tatweel, unify alef, alef maqsura/ya and ta marbuta.
+# The FTS triggers index with a frozen copy (models._FTS_NORMALIZATION_V6);
+# changing this table needs a migration that re-indexes with the new rules.
+ARABIC_NORMALIZATION = {
+    # Diacritics (fathatan .. sukun) and superscript alef
+    **{chr(c): '' for c in range(0x064B, 0x0653)},
+    '\u0670': '',
+    # Tatweel
+    '\u0640': '',
+    # Alef forms
+    'أ': 'ا', 'إ': 'ا', 'آ': 'ا', 'ٱ': 'ا',
+    # Alef maqsura -> ya
+    'ى': 'ي',
+    # Ta marbuta -> ha
+    'ة': 'ه',
+}
+
+_TRANSLATION = str.maketrans(ARABIC_NORMALIZATION)
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+# Private-use markers wrapped around matches by snippet(); replaced after escaping.
+_MATCH_START = '\x02'
+_MATCH_END = '\x03'
+
+def normalize_arabic(text):
+    return (text or '').translate(_TRANSLATION)
+
+def build_match_query(text):
+    """Turn free text into a safe FTS5 query: every word quoted, last one as a prefix."""
+    tokens = _TOKEN_RE.findall(normalize_arabic(text))
+    if not tokens:
+        return None
+    terms = [f'"{token}"' for token in tokens]
+    terms[-1] += '*'
+    return ' '.join(terms)
+
+def render_snippet(snippet):
+    return Markup(str(escape(snippet or '')).replace(_MATCH_START, '<mark>').replace(_MATCH_END, '</mark>'))
+
+def search_articles(conn, match_query, limit):
+    rows = conn.execute(
+        f"""
+        SELECT a.id, a.title_ar, a.title_en,
+               snippet(articles_fts, -1, '{_MATCH_START}', '{_MATCH_END}', '…', 16) AS snippet
+        FROM articles_fts
+        JOIN articles a ON a.id = articles_fts.rowid
+        WHERE articles_fts MATCH ? AND a.is_published = 1
+        ORDER BY bm25(articles_fts, 5.0, 5.0, 1.0, 1.0)
+        LIMIT ?
+        """,
+        (match_query, limit)
+    ).fetchall()
+    return [dict(row, snippet=render_snippet(row['snippet'])) for row in rows]
+
+def search_tips_alerts(conn, match_query, limit):
+    rows = conn.execute(
+        f"""
+        SELECT t.id, t.type,
+               snippet(tips_alerts_fts, -1, '{_MATCH_START}', '{_MATCH_END}', '…', 16) AS snippet
+        FROM tips_alerts_fts
+        JOIN tips_alerts t ON t.id = tips_alerts_fts.rowid
+        WHERE tips_alerts_fts MATCH ?
+        ORDER BY bm25(tips_alerts_fts)
+        LIMIT ?
+        """,
+        (match_query, limit)
+    ).fetchall()
+    return [dict(row, snippet=render_snippet(row['snippet'])) for row in rows]
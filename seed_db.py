@@ -2,12 +2,23 @@
 """
 Script to seed the database with sample data.
 Run this after initializing the database.
+
+    python seed_db.py                    # sample content and accounts
+    python seed_db.py --scale --reset    # plus synthetic load-testing data
 """
 
+import argparse
+import calendar
+import os
+import random
 import sqlite3
+import time
 from werkzeug.security import generate_password_hash
 from config import Config
-from models import init_db
+from models import init_db, make_excerpt, connect
+from quiz_cache import compile_quiz
+from grading import grade_many, encode_answers
+from stats import recount
 
 DATABASE = Config.DATABASE
 
@@ -72,13 +83,15 @@ def seed_database():
     
     for article in articles:
         conn.execute(
-            "INSERT OR IGNORE INTO articles (title_ar, title_en, content_ar, content_en) VALUES (?, ?, ?, ?)",
-            (article['title_ar'], article['title_en'], article['content_ar'], article['content_en'])
+            "INSERT OR IGNORE INTO articles (title_ar, title_en, content_ar, content_en, excerpt_ar, excerpt_en) VALUES (?, ?, ?, ?, ?, ?)",
+            (article['title_ar'], article['title_en'], article['content_ar'], article['content_en'],
+             make_excerpt(article['content_ar']), make_excerpt(article['content_en']))
         )
     
     # 4. Create sample quizzes
     # Delete existing quizzes to avoid duplicates during re-seeding
     conn.execute("DELETE FROM user_quiz_results")
+    conn.execute("DELETE FROM user_quiz_best")
     conn.execute("DELETE FROM quiz_options")
     conn.execute("DELETE FROM quiz_questions")
     conn.execute("DELETE FROM quizzes")
@@ -333,5 +346,201 @@ def seed_database():
     conn.close()
     print("✓ Database seeded successfully!")
 
+# --- Synthetic data for load testing ---
+
+SYNTHETIC_EMAIL_DOMAIN = 'load.test'
+SYNTHETIC_PASSWORD = 'User123456!'
+BATCH_SIZE = 10000
+ATTEMPT_POOL_SIZE = 1024  # distinct graded submissions generated per quiz
+# Synthetic timestamps end here rather than at the time of the run, so a seed always gives the same rows
+SYNTHETIC_END_DATE = '2025-01-01'
+
+DEPARTMENTS = [('IT', 30), ('HR', 10), ('Finance', 15), ('Other', 45)]
+# Most reports end up closed; a backlog stays new or in review
+REPORT_STATUS_WEIGHTS = [('closed', 65), ('in_review', 15), ('new', 20)]
+REPORT_TYPE_WEIGHTS = [('XSS', 30), ('SQLi', 15), ('CSRF', 10), ('Auth', 20), ('Other', 25)]
+FIRST_NAMES = ['أحمد', 'محمد', 'فاطمة', 'سارة', 'خالد', 'نورة', 'عمر', 'ليلى', 'يوسف', 'مريم']
+LAST_NAMES = ['العتيبي', 'الحربي', 'القحطاني', 'الشمري', 'الدوسري', 'الزهراني', 'الغامدي', 'المطيري']
+JOB_ROLES = ['مهندس أمان', 'محلل بيانات', 'مطور برمجيات', 'محاسب', 'موظف موارد بشرية', 'مدير مشروع']
+REPORT_PHRASES = [
+    'تم اكتشاف سلوك غير متوقع عند إرسال النموذج',
+    'يمكن تجاوز التحقق من الصلاحيات بتعديل المعرف في الرابط',
+    'يظهر محتوى المستخدم دون ترميز في الصفحة',
+    'تم تنفيذ الطلب دون رمز حماية صالح',
+    'رسالة الخطأ تكشف تفاصيل قاعدة البيانات',
+    'الجلسة تبقى صالحة بعد تسجيل الخروج',
+]
+
+def _weighted(rng, weights, count):
+    values, cum = zip(*weights)
+    return rng.choices(values, weights=cum, k=count)
+
+def _batches(rows, size=BATCH_SIZE):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def _insert_many(conn, sql, rows):
+    count = 0
+    for batch in _batches(rows):
+        conn.executemany(sql, batch)
+        count += len(batch)
+    return count
+
+def _timestamps(rng, count, days, end):
+    """`count` ascending unix timestamps spread over the `days` days before `end`.
+
+    Inserted through datetime(?, 'unixepoch'), which formats them in C.
+    """
+    span = days * 86400
+    start = end - span
+    return sorted(start + rng.randrange(span) for _ in range(count))
+
+def seed_scale(users, reports, attempts, seed=0, days=730, end_date=SYNTHETIC_END_DATE):
+    """Add synthetic users, reports and quiz attempts on top of the sample data.
+
+    Generation is deterministic for a given seed and end_date ('YYYY-MM-DD',
+    UTC), the day the synthetic history ends. All synthetic accounts share
+    one precomputed password hash (password: SYNTHETIC_PASSWORD).
+    """
+    rng = random.Random(seed)
+    end = calendar.timegm(time.strptime(end_date, '%Y-%m-%d'))
+    conn = connect(DATABASE)
+    # Bulk-load settings: no rollback journal or fsync while loading
+    conn.execute("PRAGMA journal_mode = OFF")
+    conn.execute("PRAGMA synchronous = OFF")
+    conn.execute("PRAGMA locking_mode = EXCLUSIVE")
+    conn.execute("PRAGMA temp_store = MEMORY")
+    conn.execute("PRAGMA cache_size = -262144")  # 256MB, also the sorter budget for CREATE INDEX
+    conn.execute("PRAGMA threads = 4")  # parallel sorting while building indexes
+    started = time.perf_counter()
+    # Counter triggers would fire per row; the migrated definitions are restored and recounted at the end
+    stats_triggers = conn.execute(
+        "SELECT name, sql FROM sqlite_master WHERE type = 'trigger' AND name GLOB 'stats_*' "
+        "AND tbl_name IN ('users', 'reports')"
+    ).fetchall()
+    for trigger in stats_triggers:
+        conn.execute(f"DROP TRIGGER {trigger['name']}")
+    # Building indexes once after the load is several times faster than maintaining them
+    indexes = conn.execute(
+        "SELECT name, sql FROM sqlite_master WHERE type = 'index' AND sql IS NOT NULL "
+        "AND tbl_name IN ('reports', 'user_quiz_results')"
+    ).fetchall()
+    for index in indexes:
+        conn.execute(f"DROP INDEX {index['name']}")
+
+    password_hash = generate_password_hash(SYNTHETIC_PASSWORD, method=Config.PASSWORD_HASH_METHOD)
+    departments = _weighted(rng, DEPARTMENTS, users)
+    inserted = _insert_many(conn, (
+        "INSERT INTO users (full_name, email, password_hash, department, job_role, role) "
+        "VALUES (?, ?, ?, ?, ?, 'user')"
+    ), (
+        (f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}', f'user{i}@{SYNTHETIC_EMAIL_DOMAIN}',
+         password_hash, departments[i], rng.choice(JOB_ROLES))
+        for i in range(users)
+    ))
+    print(f"  users: {inserted}")
+
+    user_ids = [row[0] for row in conn.execute(
+        "SELECT id FROM users WHERE email LIKE ? ORDER BY id", (f'%@{SYNTHETIC_EMAIL_DOMAIN}',)
+    )]
+
+    # Per-row values are drawn in bulk; text comes from small precomputed pools
+    descriptions = ['. '.join(rng.sample(REPORT_PHRASES, rng.randint(2, 4))) for _ in range(256)]
+    # A few users file most reports: skew the choice towards low indexes
+    owners = [user_ids[int(len(user_ids) * r * r)] for r in [rng.random() for _ in range(reports)]]
+    inserted = _insert_many(conn, (
+        "INSERT INTO reports (user_id, report_type, title, description, status, created_at, updated_at) "
+        "VALUES (?1, ?2, ?2 || ': ' || ?3, ?4, ?5, datetime(?6, 'unixepoch'), datetime(?6, 'unixepoch'))"
+    ), zip(
+        owners,
+        _weighted(rng, REPORT_TYPE_WEIGHTS, reports),
+        rng.choices(REPORT_PHRASES, k=reports),
+        rng.choices(descriptions, k=reports),
+        _weighted(rng, REPORT_STATUS_WEIGHTS, reports),
+        _timestamps(rng, reports, days, end),
+    ))
+    print(f"  reports: {inserted}")
+
+    # Attempts store their answers so they can be re-graded like real ones
+    quizzes = [compile_quiz(conn, row[0]) for row in conn.execute("SELECT id FROM quizzes ORDER BY id")]
+    quizzes = [quiz for quiz in quizzes if quiz and quiz.items]
+
+    def submissions(quiz, count=ATTEMPT_POOL_SIZE):
+        """(quiz_id, score, encoded answers) for `count` graded random submissions."""
+        # Right about 70% of the time
+        answer_sets = [
+            tuple(correct if rng.random() < 0.7 else rng.randrange(len(item.options))
+                  for correct, item in zip(quiz.answer_key, quiz.items))
+            for _ in range(count)
+        ]
+        return [(quiz.quiz.id, result.percentage, encode_answers(quiz.question_ids, answers))
+                for answers, result in zip(answer_sets, grade_many(quiz.answer_key, answer_sets))]
+
+    inserted = 0
+    if quizzes and user_ids:
+        pool = [submission for quiz in quizzes for submission in submissions(quiz)]
+        inserted = _insert_many(conn, (
+            "INSERT INTO user_quiz_results (user_id, quiz_id, score, answers, created_at) "
+            "VALUES (?1, ?2, ?3, ?4, datetime(?5, 'unixepoch'))"
+        ), (
+            (user_id, *submission, created_at)
+            for user_id, submission, created_at in zip(
+                rng.choices(user_ids, k=attempts), rng.choices(pool, k=attempts),
+                _timestamps(rng, attempts, days, end))
+        ))
+    for index in indexes:
+        conn.execute(index['sql'])
+    conn.execute("DELETE FROM user_quiz_best")
+    conn.execute("""
+        INSERT INTO user_quiz_best (user_id, quiz_id, best_score, attempts, last_attempt_at)
+        SELECT user_id, quiz_id, MAX(score), COUNT(*), MAX(created_at)
+        FROM user_quiz_results GROUP BY user_id, quiz_id
+    """)
+    print(f"  quiz attempts: {inserted}")
+
+    for trigger in stats_triggers:
+        conn.execute(trigger['sql'])
+    recount(conn, ['users', 'reports'], fix=True)
+
+    conn.commit()
+    conn.execute("ANALYZE")
+    conn.execute("PRAGMA locking_mode = NORMAL")
+    conn.execute(f"PRAGMA journal_mode = {Config.SQLITE_JOURNAL_MODE}")
+    conn.close()
+    print(f"✓ Synthetic data generated in {time.perf_counter() - started:.1f}s")
+
+def _remove_database():
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(DATABASE + suffix):
+            os.remove(DATABASE + suffix)
+
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scale', action='store_true', help='also generate synthetic load-testing data')
+    parser.add_argument('--users', type=int, default=10000)
+    parser.add_argument('--reports', type=int, default=1000000)
+    parser.add_argument('--attempts', type=int, default=200000)
+    parser.add_argument('--seed', type=int, default=0, help='random seed; same seed, same data')
+    parser.add_argument('--end-date', default=SYNTHETIC_END_DATE,
+                        help='YYYY-MM-DD (UTC) on which the synthetic history ends')
+    parser.add_argument('--reset', action='store_true', help=f'delete {DATABASE} before seeding')
+    args = parser.parse_args()
+    try:
+        time.strptime(args.end_date, '%Y-%m-%d')
+    except ValueError:
+        parser.error(f'--end-date must be YYYY-MM-DD, got {args.end_date!r}')
+
+    if args.reset:
+        _remove_database()
+    elif args.scale and os.path.exists(DATABASE):
+        parser.error(f'{DATABASE} already exists; pass --reset to rebuild it')
+
     seed_database()
+    if args.scale:
+        seed_scale(args.users, args.reports, args.attempts, seed=args.seed, end_date=args.end_date)
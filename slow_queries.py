@@ -0,0 +1,152 @@
+"""
+Log of statements slower than SLOW_QUERY_THRESHOLD_MS, with their query plans.
+
+Registered as a models.query_observers hook, so it sees every statement
+run through a pooled request connection. A slow statement is logged and
+recorded under a fingerprint of its normalised SQL and EXPLAIN QUERY
+PLAN output: repeated calls of the same query with the same plan collapse
+into one row, while a plan that changes (say, an index stops being used)
+shows up as a new row. Rows are buffered per worker and added to the
+slow_queries table in batches.
+"""
+
+import hashlib
+import logging
+import re
+import sqlite3
+from flask import has_request_context, request
+from write_behind import WriteBehindBuffer
+
+logger = logging.getLogger(__name__)
+
+# Statements EXPLAIN QUERY PLAN can describe
+_EXPLAINABLE = ('SELECT', 'INSERT', 'UPDATE', 'DELETE', 'REPLACE', 'WITH')
+
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PLACEHOLDER_LIST_RE = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+
+def normalize_sql(sql):
+    """SQL with literals replaced by ? and placeholder lists collapsed, on one line."""
+    sql = _STRING_RE.sub('?', sql)
+    sql = _NUMBER_RE.sub('?', sql)
+    sql = _PLACEHOLDER_LIST_RE.sub('(?, ...)', sql)
+    return ' '.join(sql.split())
+
+def parameters_shape(parameters):
+    """Types of the bound parameters, e.g. '(int, str, null)'; values are never stored."""
+    if parameters is None:
+        return 'executemany'
+    if isinstance(parameters, dict):
+        return '{' + ', '.join(f'{name}: {_type_name(value)}' for name, value in parameters.items()) + '}'
+    return '(' + ', '.join(_type_name(value) for value in parameters) + ')'
+
+def _type_name(value):
+    return 'null' if value is None else type(value).__name__
+
+def explain(conn, sql, parameters):
+    """EXPLAIN QUERY PLAN output as indented lines, or '' if the statement has no plan."""
+    if parameters is None or not sql.lstrip().upper().startswith(_EXPLAINABLE):
+        return ''
+    try:
+        # Straight to sqlite3 so the EXPLAIN itself is not observed
+        rows = sqlite3.Connection.execute(conn, 'EXPLAIN QUERY PLAN ' + sql, parameters).fetchall()
+    except sqlite3.Error:
+        return ''
+    depth = {0: -1}
+    lines = []
+    for node_id, parent, _, detail in rows:
+        depth[node_id] = depth.get(parent, -1) + 1
+        lines.append('  ' * depth[node_id] + detail)
+    return '\n'.join(lines)
+
+def is_full_scan(plan):
+    """True if the plan scans a table without an index."""
+    for line in plan.splitlines():
+        detail = line.strip()
+        if (detail.startswith('SCAN ') and ' USING ' not in detail
+                and 'VIRTUAL TABLE' not in detail and detail != 'SCAN CONSTANT ROW'):
+            return True
+    return False
+
+def top_slow_queries(conn, limit=20, full_scans_only=False):
+    """Recorded slow queries, most total time first."""
+    return conn.execute(
+        "SELECT * FROM slow_queries WHERE full_scan >= ? ORDER BY total_seconds DESC LIMIT ?",
+        (int(full_scans_only), limit)
+    ).fetchall()
+
+class SlowQueryLog(WriteBehindBuffer):
+    """Per-worker buffer of slow statements, added to slow_queries in batches."""
+    thread_name = 'slow-query-flush'
+    description = 'slow queries'
+
+    def __init__(self, threshold_ms=100, flush_interval=15, database=None):
+        super().__init__(flush_interval, database)
+        self.threshold = threshold_ms / 1000
+        self._pending = {}  # fingerprint -> row dict
+        self._logged = set()  # fingerprints whose plan this worker already logged
+
+    def observe(self, conn, sql, parameters, seconds):
+        """models.query_observers hook."""
+        if not self.threshold or seconds < self.threshold:
+            return
+        normalized = normalize_sql(sql)
+        plan = explain(conn, sql, parameters)
+        fingerprint = hashlib.blake2b(f'{normalized}\n{plan}'.encode(), digest_size=8).hexdigest()
+        shape = parameters_shape(parameters)
+        endpoint = request.endpoint if has_request_context() else None
+
+        with self._lock:
+            entry = self._pending.get(fingerprint)
+            if entry is None:
+                entry = self._pending[fingerprint] = {
+                    'fingerprint': fingerprint, 'sql': normalized, 'plan': plan, 'full_scan': is_full_scan(plan),
+                    'params_shape': shape, 'endpoint': endpoint, 'calls': 0, 'total_seconds': 0.0,
+                    'max_seconds': 0.0,
+                }
+            entry['calls'] += 1
+            entry['total_seconds'] += seconds
+            entry['max_seconds'] = max(entry['max_seconds'], seconds)
+            first = fingerprint not in self._logged
+            self._logged.add(fingerprint)
+
+        if first:
+            logger.warning("Slow query %s (%.1f ms, %s, params %s): %s\n%s", fingerprint, seconds * 1000,
+                           endpoint, shape, normalized, plan or '(no plan)')
+        else:
+            logger.warning("Slow query %s (%.1f ms, %s)", fingerprint, seconds * 1000, endpoint)
+        self._ensure_timer()
+
+    def _take(self):
+        pending, self._pending = self._pending, {}
+        return pending
+
+    def _write(self, conn, pending):
+        conn.executemany(
+            """
+            INSERT INTO slow_queries (fingerprint, sql, plan, full_scan, params_shape, endpoint,
+                                      calls, total_seconds, max_seconds)
+            VALUES (:fingerprint, :sql, :plan, :full_scan, :params_shape, :endpoint,
+                    :calls, :total_seconds, :max_seconds)
+            ON CONFLICT (fingerprint) DO UPDATE SET
+                calls = calls + excluded.calls,
+                total_seconds = total_seconds + excluded.total_seconds,
+                max_seconds = max(max_seconds, excluded.max_seconds),
+                params_shape = excluded.params_shape,
+                endpoint = coalesce(excluded.endpoint, endpoint),
+                last_seen = CURRENT_TIMESTAMP
+            """,
+            list(pending.values())
+        )
+        return len(pending)
+
+    def _restore(self, pending):
+        for fingerprint, entry in pending.items():
+            current = self._pending.get(fingerprint)
+            if current is None:
+                self._pending[fingerprint] = entry
+            else:
+                current['calls'] += entry['calls']
+                current['total_seconds'] += entry['total_seconds']
+                current['max_seconds'] = max(current['max_seconds'], entry['max_seconds'])
@@ -0,0 +1,107 @@
+"""
+Content-hashed static asset URLs with precompressed variants.
+
+StaticAssets.build() hashes every file under the static folder and, for
+text assets, writes .gz (and .br when the optional brotli package is
+installed) siblings next to them. Templates link to the hashed name, e.g.
+css/style.3f2a9c1b0d4e.css, which can be cached forever because any
+change to the file produces a new URL.
+"""
+
+import gzip
+import hashlib
+import os
+import posixpath
+import tempfile
+from collections import namedtuple
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_EXTENSIONS = {'.css', '.js', '.svg', '.json', '.txt', '.xml', '.html'}
+MIN_COMPRESS_SIZE = 256  # bytes; smaller files are not worth a second request path
+
+# content-coding -> sibling suffix, in order of preference
+ENCODING_SUFFIXES = {'br': '.br', 'gzip': '.gz'}
+
+# path: relative to the static folder; encodings: available content-codings, preferred first
+Asset = namedtuple('Asset', 'path url_name encodings')
+
+def _compress(encoding, data):
+    if encoding == 'br':
+        return brotli.compress(data, quality=11)
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+def _write_atomic(path, data):
+    # Several workers may build at startup at the same time
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+class StaticAssets:
+    def __init__(self, folder, exclude=()):
+        self.folder = folder
+        self.exclude = set(exclude)
+        self._by_path = {}
+        self._by_url_name = {}
+
+    def build(self):
+        """Hash all assets and write missing or outdated compressed siblings. Returns self."""
+        by_path = {}
+        for root, dirs, files in os.walk(self.folder):
+            rel_root = os.path.relpath(root, self.folder)
+            dirs[:] = [d for d in dirs if os.path.normpath(os.path.join(rel_root, d)) not in self.exclude]
+            for name in files:
+                if name.startswith('.') or name.endswith(tuple(ENCODING_SUFFIXES.values())):
+                    continue
+                full_path = os.path.join(root, name)
+                path = os.path.normpath(os.path.join(rel_root, name)).replace(os.sep, '/')
+                by_path[path] = self._build_asset(path, full_path)
+        self._by_path = by_path
+        self._by_url_name = {asset.url_name: asset for asset in by_path.values()}
+        return self
+
+    def _build_asset(self, path, full_path):
+        with open(full_path, 'rb') as f:
+            data = f.read()
+        stem, ext = os.path.splitext(path)
+        url_name = f'{stem}.{hashlib.sha256(data).hexdigest()[:12]}{ext}'
+
+        encodings = []
+        if ext.lower() in COMPRESSIBLE_EXTENSIONS and len(data) >= MIN_COMPRESS_SIZE:
+            source_mtime = os.path.getmtime(full_path)
+            for encoding, suffix in ENCODING_SUFFIXES.items():
+                if encoding == 'br' and brotli is None:
+                    continue
+                target = full_path + suffix
+                if not os.path.exists(target) or os.path.getmtime(target) < source_mtime:
+                    _write_atomic(target, _compress(encoding, data))
+                encodings.append(encoding)
+        return Asset(path, url_name, tuple(encodings))
+
+    def __len__(self):
+        return len(self._by_path)
+
+    def paths(self):
+        return list(self._by_path)
+
+    def url_name(self, path):
+        """Hashed name for `path`, or `path` itself if it is not a known asset."""
+        asset = self._by_path.get(path)
+        return asset.url_name if asset else path
+
+    def is_excluded(self, path):
+        """True if `path` lies under an excluded folder and must not be served as static."""
+        path = posixpath.normpath(path.replace('\\', '/')).lstrip('/')
+        return any(path == folder or path.startswith(folder.rstrip('/') + '/') for folder in self.exclude)
+
+    def resolve(self, url_name):
+        """The Asset behind a hashed name, or None."""
+        return self._by_url_name.get(url_name)
@@ -0,0 +1,88 @@
+"""
+Incrementally maintained row counts for the admin screens.
+
+stats_counters holds one (name, value) row per counter. Triggers on the
+source tables keep the values current, so reading a statistic is a primary
+key lookup instead of a COUNT(*) scan. The triggers are defined by the
+migrations (see migration 8 in models.py). To add a counter, add its
+expression below and a migration that recreates the triggers of the
+affected table; recount() then checks the triggers against the
+expressions here.
+"""
+
+# table -> SQL expressions naming the counter for a row; `{row}` is replaced by the table name
+STATS_COUNTERS = {
+    'reports': [
+        "'reports'",
+        "'reports.status.' || {row}.status",
+        "'reports.type.' || {row}.report_type",
+        "'reports.status_type.' || {row}.status || '|' || {row}.report_type",
+    ],
+    'users': [
+        "'users'",
+        "'users.role.' || {row}.role",
+        "'users.department.' || coalesce({row}.department, '')",
+    ],
+    'articles': [
+        "'articles'",
+    ],
+    'quizzes': [
+        "'quizzes'",
+    ],
+}
+
+def recount(conn, tables=None, fix=False):
+    """Recompute counters from the source tables and compare with stored values.
+
+    Returns {name: (stored, actual)} for every counter that drifted. With
+    fix=True the stored values are overwritten with the recomputed ones.
+    Caller commits.
+    """
+    tables = tables or list(STATS_COUNTERS)
+    actual = {}
+    for table in tables:
+        for expr in STATS_COUNTERS[table]:
+            name = expr.format(row=table)
+            for row in conn.execute(f"SELECT {name} AS name, COUNT(*) AS count FROM {table} GROUP BY 1"):
+                actual[row['name']] = row['count']
+
+    stored = {
+        row['name']: row['value']
+        for row in conn.execute("SELECT name, value FROM stats_counters")
+        if any(row['name'] == table or row['name'].startswith(table + '.') for table in tables)
+    }
+    # Whole-table counters must exist even for empty tables
+    for table in tables:
+        actual.setdefault(table, 0)
+
+    drift = {}
+    for name in set(stored) | set(actual):
+        actual_value = actual.get(name, 0)
+        if name not in stored or stored[name] != actual_value:
+            drift[name] = (stored.get(name), actual_value)
+
+    if fix and drift:
+        conn.executemany(
+            "INSERT INTO stats_counters (name, value) VALUES (?, ?) "
+            "ON CONFLICT (name) DO UPDATE SET value = excluded.value",
+            [(name, actual_value) for name, (_, actual_value) in drift.items()]
+        )
+    return drift
+
+def get_counters(conn, names):
+    """Read several counters in one query; missing counters read as 0."""
+    placeholders = ', '.join('?' for _ in names)
+    rows = conn.execute(
+        f"SELECT name, value FROM stats_counters WHERE name IN ({placeholders})", list(names)
+    ).fetchall()
+    values = {name: 0 for name in names}
+    values.update((row['name'], row['value']) for row in rows)
+    return values
+
+def get_counters_with_prefix(conn, prefix):
+    """Read all counters whose name starts with `prefix`, keyed by the remainder."""
+    rows = conn.execute(
+        "SELECT name, value FROM stats_counters WHERE name >= ? AND name < ?",
+        (prefix, prefix + '\uffff')
+    ).fetchall()
+    return {row['name'][len(prefix):]: row['value'] for row in rows}
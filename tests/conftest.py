@@ -0,0 +1,41 @@
+import atexit
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Config reads these at import, which happens while test modules are collected
+DATA_DIR = tempfile.mkdtemp(prefix='cyberport-tests-')
+os.environ.update(DATABASE=os.path.join(DATA_DIR, 'test.sqlite'), UPLOAD_FOLDER=os.path.join(DATA_DIR, 'uploads'),
+                  JOBS_WORKER_THREADS='0')
+# Registered first, so it runs after the app's own atexit flushes
+atexit.register(shutil.rmtree, DATA_DIR, ignore_errors=True)
+
+@pytest.fixture(scope='session')
+def app():
+    """The application bound to a freshly seeded database in a temp directory."""
+    subprocess.run([sys.executable, os.path.join(ROOT, 'seed_db.py')], cwd=ROOT, env=os.environ,
+                   check=True, capture_output=True)
+    from app import app
+    app.config.update(TESTING=True, WTF_CSRF_ENABLED=False)
+    return app
+
+@pytest.fixture
+def user_client(app):
+    client = app.test_client()
+    response = client.post('/login', data={'email': 'ahmed@example.com', 'password': 'User123456!'})
+    assert response.status_code == 302
+    return client
+
+@pytest.fixture
+def admin_client(app):
+    client = app.test_client()
+    response = client.post('/login', data={'email': app.config['ADMIN_EMAIL'],
+                                           'password': app.config['ADMIN_PASSWORD']})
+    assert response.status_code == 302
+    return client
@@ -0,0 +1,40 @@
+import re
+import sqlite3
+import pytest
+import models
+from slow_queries import explain
+
+@pytest.fixture
+def statements():
+    """SQL statements run on request connections while the test is active."""
+    seen = []
+    observer = lambda conn, sql, parameters, seconds: seen.append((conn, sql, parameters))
+    models.query_observers.append(observer)
+    yield seen
+    models.query_observers.remove(observer)
+
+@pytest.mark.parametrize('query_string', [{}, {'status': 'new'}, {'type': 'XSS'},
+                                          {'status': 'new', 'type': 'XSS'}])
+def test_report_page_is_picked_from_a_covering_index(admin_client, statements, query_string):
+    first = admin_client.get('/admin/reports', query_string=dict(query_string, per_page=1))
+    assert first.status_code == 200
+    listing = [s for s in statements if 'FROM (SELECT id, created_at FROM reports' in s[1]]
+    assert listing
+    conn, sql, parameters = listing[-1]
+    plan = explain(conn, sql, parameters)
+    scans = [line.strip() for line in plan.splitlines() if line.strip().startswith(('SCAN reports', 'SEARCH reports'))]
+    assert scans and all('USING COVERING INDEX' in line for line in scans), plan
+
+def test_pages_follow_each_other_newest_first(app, admin_client):
+    conn = sqlite3.connect(app.config['DATABASE'])
+    expected = [row[0] for row in conn.execute("SELECT id FROM reports ORDER BY created_at DESC, id DESC")]
+    conn.close()
+    seen, url = [], '/admin/reports?per_page=2'
+    for _ in range(len(expected)):
+        html = admin_client.get(url).get_data(as_text=True)
+        seen += [int(report_id) for report_id in re.findall(r'/admin/report/(\d+)"', html)]
+        next_link = re.search(r'href="([^"]*)" class="btn btn-primary btn-sm">التالي', html)
+        if not next_link:
+            break
+        url = next_link.group(1).replace('&amp;', '&')
+    assert seen == expected
@@ -0,0 +1,49 @@
+import io
+import sqlite3
+import pytest
+from jobs import JobWorker
+
+def submit(client, content):
+    return client.post('/report', data={
+        'report_type': 'Other', 'title': 'With attachment', 'description': 'See attached',
+        'file_upload': (io.BytesIO(content), 'evidence.pdf'),
+    }, content_type='multipart/form-data')
+
+def latest_report(app):
+    """(report id, scan status) of the last report submitted by submit()."""
+    conn = sqlite3.connect(app.config['DATABASE'])
+    try:
+        return conn.execute(
+            "SELECT r.id, a.scan_status FROM reports r JOIN attachments a ON a.sha256 = r.attachment_sha256 "
+            "WHERE r.description = 'See attached' ORDER BY r.id DESC LIMIT 1"
+        ).fetchone()
+    finally:
+        conn.close()
+
+def scan_status(app):
+    return latest_report(app)[1]
+
+@pytest.mark.parametrize('content, expected', [
+    (b'%PDF-1.4\ncomplete document\n%%EOF\n', 'clean'),
+    (b'%PDF-1.4\ntruncated upl', 'rejected'),
+])
+def test_attachment_is_scanned_by_a_job_after_the_response(app, user_client, content, expected):
+    assert submit(user_client, content).status_code == 302
+    assert scan_status(app) == 'pending'
+
+    assert JobWorker(app.config['DATABASE']).run_until_empty() >= 1
+    assert scan_status(app) == expected
+
+@pytest.mark.parametrize('content, status_code', [
+    (b'%PDF-1.4\ndownloadable document\n%%EOF\n', 200),
+    (b'%PDF-1.4\nrejected upl', 302),
+])
+def test_rejected_attachments_are_not_served(app, user_client, admin_client, content, status_code):
+    assert submit(user_client, content).status_code == 302
+    JobWorker(app.config['DATABASE']).run_until_empty()
+    report_id = latest_report(app)[0]
+    for client in (user_client, admin_client):
+        response = client.get(f'/report/{report_id}/attachment')
+        assert response.status_code == status_code
+        if status_code == 200:
+            assert response.data == content
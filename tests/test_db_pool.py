@@ -0,0 +1,49 @@
+import sqlite3
+import time
+from contextlib import contextmanager
+
+@contextmanager
+def open_read_transaction(database):
+    """A second connection holding a read snapshot, as a long-running reader would."""
+    reader = sqlite3.connect(database)
+    try:
+        reader.execute("BEGIN")
+        reader.execute("SELECT COUNT(*) FROM reports").fetchone()
+        yield reader
+    finally:
+        reader.rollback()
+        reader.close()
+
+def count(database, sql, *params):
+    conn = sqlite3.connect(database)
+    try:
+        return conn.execute(sql, params).fetchone()[0]
+    finally:
+        conn.close()
+
+def test_pooled_connections_use_wal(app):
+    assert count(app.config['DATABASE'], "PRAGMA journal_mode") == 'wal'
+
+def test_submit_report_commits_while_reader_is_open(app, user_client):
+    database = app.config['DATABASE']
+    before = count(database, "SELECT COUNT(*) FROM reports")
+    with open_read_transaction(database):
+        start = time.monotonic()
+        response = user_client.post('/report', data={'report_type': 'XSS', 'title': 'Reader test',
+                                                      'description': 'Submitted during a read transaction'})
+        elapsed = time.monotonic() - start
+    assert response.status_code == 302
+    assert elapsed < app.config['SQLITE_BUSY_TIMEOUT'] / 1000
+    assert count(database, "SELECT COUNT(*) FROM reports") == before + 1
+
+def test_submit_quiz_commits_while_reader_is_open(app, user_client):
+    database = app.config['DATABASE']
+    quiz_id = count(database, "SELECT MIN(id) FROM quizzes")
+    before = count(database, "SELECT COUNT(*) FROM user_quiz_results WHERE quiz_id = ?", quiz_id)
+    with open_read_transaction(database):
+        start = time.monotonic()
+        response = user_client.post(f'/submit-quiz/{quiz_id}', data={'question_1': '1'})
+        elapsed = time.monotonic() - start
+    assert response.status_code == 302
+    assert elapsed < app.config['SQLITE_BUSY_TIMEOUT'] / 1000
+    assert count(database, "SELECT COUNT(*) FROM user_quiz_results WHERE quiz_id = ?", quiz_id) == before + 1
@@ -0,0 +1,45 @@
+import sqlite3
+from grading import encode_answers, regrade_quiz_attempts
+from quiz_cache import CompiledQuiz, Quiz
+
+QUESTION_IDS = (11, 12)
+
+class CountingConnection(sqlite3.Connection):
+    commits = 0
+
+    def commit(self):
+        self.commits += 1
+        super().commit()
+
+def make_database(path):
+    conn = sqlite3.connect(path, factory=CountingConnection)
+    conn.row_factory = sqlite3.Row
+    conn.executescript("""
+        CREATE TABLE user_quiz_results (id INTEGER PRIMARY KEY, user_id INTEGER, quiz_id INTEGER, score INTEGER,
+                                        answers TEXT, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP);
+        CREATE TABLE user_quiz_best (user_id INTEGER, quiz_id INTEGER, best_score INTEGER, attempts INTEGER,
+                                     last_attempt_at TIMESTAMP, PRIMARY KEY (user_id, quiz_id));
+    """)
+    # Graded against the old key (1, 1): user 1 scored 100 and 50, user 2 scored 0
+    conn.executemany(
+        "INSERT INTO user_quiz_results (user_id, quiz_id, score, answers) VALUES (?, 1, ?, ?)",
+        [(1, 100, encode_answers(QUESTION_IDS, (1, 1))), (1, 50, encode_answers(QUESTION_IDS, (1, 2))),
+         (2, 0, encode_answers(QUESTION_IDS, (2, 2)))]
+    )
+    conn.commit()
+    conn.commits = 0
+    return conn
+
+def test_regrade_commits_every_batch(tmp_path):
+    conn = make_database(str(tmp_path / 'grading.sqlite'))
+    compiled = CompiledQuiz(Quiz(1, '', '', 50, None), 1, (), QUESTION_IDS, (2, 2))
+
+    assert regrade_quiz_attempts(conn, compiled, batch_size=1) == 2  # the 50 stays 50
+    assert conn.commits == 4  # three batches, then user_quiz_best
+    assert not conn.in_transaction
+    rows = conn.execute("SELECT user_id, best_score, attempts FROM user_quiz_best ORDER BY user_id").fetchall()
+    assert [tuple(row) for row in rows] == [(1, 50, 2), (2, 100, 1)]
+
+    # A repeated run finds nothing left to change
+    assert regrade_quiz_attempts(conn, compiled, batch_size=1) == 0
+    conn.close()
@@ -0,0 +1,76 @@
+import sqlite3
+import threading
+import time
+import pytest
+import jobs
+from jobs import JobWorker, enqueue, register_job
+
+done = []
+
+@register_job('test.record', concurrency=2)
+def record_job(conn, payload):
+    done.append(payload['n'])
+
+def wait_for(predicate, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.02)
+    return False
+
+def enqueue_record(app, n):
+    conn = sqlite3.connect(app.config['DATABASE'])
+    with conn:
+        enqueue(conn, 'test.record', {'n': n})
+    conn.close()
+
+@pytest.fixture
+def worker(app):
+    worker = JobWorker(app.config['DATABASE'], poll_interval=0.05)
+    yield worker
+    worker.stop(5)
+    conn = sqlite3.connect(app.config['DATABASE'])
+    with conn:
+        conn.execute("DELETE FROM jobs WHERE job_type = 'test.record'")
+    conn.close()
+
+def test_worker_survives_a_failure_to_record_the_outcome(app, worker, monkeypatch):
+    real_run_job = jobs.run_job
+    calls = []
+
+    def flaky_run_job(conn, job):
+        calls.append(job['id'])
+        if len(calls) == 1:
+            raise sqlite3.OperationalError('database is locked')
+        return real_run_job(conn, job)
+
+    monkeypatch.setattr(jobs, 'run_job', flaky_run_job)
+    done.clear()
+    worker.start()
+    enqueue_record(app, 1)
+    assert wait_for(lambda: len(calls) == 1)
+    # The first job stays claimed until its visibility timeout; the thread moves on
+    enqueue_record(app, 2)
+    assert wait_for(lambda: 2 in done)
+    assert all(thread.is_alive() for thread in worker._threads)
+
+@pytest.mark.filterwarnings('ignore::pytest.PytestUnhandledThreadExceptionWarning')
+def test_start_replaces_dead_threads(app, worker, monkeypatch):
+    real_connect = jobs.connect
+    failed = threading.Event()
+
+    def connect_once_failing(database):
+        if not failed.is_set():
+            failed.set()
+            raise sqlite3.OperationalError('unable to open database file')
+        return real_connect(database)
+
+    monkeypatch.setattr(jobs, 'connect', connect_once_failing)
+    worker.start()
+    assert wait_for(lambda: failed.is_set() and not worker._threads[0].is_alive())
+
+    done.clear()
+    worker.start()
+    enqueue_record(app, 3)
+    assert wait_for(lambda: 3 in done)
@@ -0,0 +1,26 @@
+import app as app_module
+from passwords import HasherBusy
+
+def test_login_succeeds_when_the_optional_rehash_is_busy(app, monkeypatch):
+    def busy(user, password):
+        raise HasherBusy()
+    monkeypatch.setattr(app_module, 'rehash_password_if_needed', busy)
+
+    client = app.test_client()
+    response = client.post('/login', data={'email': 'ahmed@example.com', 'password': 'User123456!'})
+    assert response.status_code == 302
+    with client.session_transaction() as session:
+        assert session['user_email'] == 'ahmed@example.com'
+
+def test_wrong_password_is_rejected(app):
+    response = app.test_client().post('/login', data={'email': 'ahmed@example.com', 'password': 'wrong'})
+    assert response.status_code == 200
+
+def test_logout_forgets_the_cached_role(app, admin_client):
+    assert admin_client.get('/admin').status_code == 200
+    with admin_client.session_transaction() as session:
+        user_id = session['user_id']
+    assert any(key[0] == user_id for key in app_module.auth_cache._entries)
+
+    admin_client.get('/logout')
+    assert not any(key[0] == user_id for key in app_module.auth_cache._entries)
@@ -0,0 +1,14 @@
+import pytest
+
+@pytest.mark.parametrize('url', ['/', '/en/', '/articles', '/quizzes'])
+def test_anonymous_pages_do_not_vary_on_cookie(app, url):
+    client = app.test_client()
+    for _ in range(2):  # cache miss, then hit
+        response = client.get(url)
+        assert response.status_code == 200
+        assert 'Cookie' not in response.vary
+
+def test_logged_in_pages_vary_on_cookie(user_client):
+    response = user_client.get('/')
+    assert 'Cookie' in response.vary
+    assert 'تسجيل الخروج'.encode() in response.data
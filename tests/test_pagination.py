@@ -0,0 +1,26 @@
+import sqlite3
+import pytest
+from pagination import decode_cursor, encode_cursor
+
+@pytest.mark.parametrize('values', [([1], [2]), ({'a': 1}, 2), (10 ** 30, 1), ('2024-01-01', 1.5),
+                                    (None, 1), (True, 1)])
+def test_malformed_elements_are_rejected(values):
+    assert decode_cursor(encode_cursor(*values), 2) is None
+
+def test_valid_cursor_round_trips():
+    assert decode_cursor(encode_cursor('2024-01-01 10:00:00', 2 ** 63 - 1), 2) == ('2024-01-01 10:00:00', 2 ** 63 - 1)
+
+@pytest.mark.parametrize('values', [([1], [2]), ({'a': 1}, 2), (10 ** 30, 1)])
+def test_articles_ignore_a_malformed_cursor(app, values):
+    conn = sqlite3.connect(app.config['DATABASE'])
+    newest = conn.execute("SELECT title_ar FROM articles WHERE is_published = 1 "
+                          "ORDER BY created_at DESC, id DESC LIMIT 1").fetchone()[0]
+    conn.close()
+    response = app.test_client().get('/articles', query_string={'cursor': encode_cursor(*values)})
+    assert response.status_code == 200
+    assert newest in response.get_data(as_text=True)  # page one
+
+@pytest.mark.parametrize('values', [([1], [2]), ({'a': 1}, 2), (10 ** 30, 1)])
+def test_admin_reports_ignore_a_malformed_cursor(admin_client, values):
+    response = admin_client.get('/admin/reports', query_string={'cursor': encode_cursor(*values)})
+    assert response.status_code == 200
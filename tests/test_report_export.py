@@ -0,0 +1,20 @@
+import pytest
+from report_export import parse_timestamp_arg
+
+@pytest.mark.parametrize('value, expected', [
+    ('2024-03-01', '2024-03-01 00:00:00'),
+    ('2024-03-01T10:30:00', '2024-03-01 10:30:00'),
+    ('2024-03-01T10:30:00Z', '2024-03-01 10:30:00'),
+    ('2024-03-01T10:30:00+03:00', '2024-03-01 07:30:00'),
+    ('2024-03-01T01:00:00+03:00', '2024-02-29 22:00:00'),
+    ('2024-03-01T20:00:00-05:00', '2024-03-02 01:00:00'),
+])
+def test_timestamps_are_converted_to_utc(value, expected):
+    assert parse_timestamp_arg(value) == expected
+
+def test_empty_value_means_no_bound():
+    assert parse_timestamp_arg('') is None
+
+def test_invalid_value_raises():
+    with pytest.raises(ValueError):
+        parse_timestamp_arg('yesterday')
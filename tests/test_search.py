@@ -0,0 +1,39 @@
+import sqlite3
+import pytest
+
+TEXT_AR = 'لوحة فُسَيْفِسَاء ملوّنة'
+
+@pytest.fixture
+def article_id(app):
+    conn = sqlite3.connect(app.config['DATABASE'])
+    cursor = conn.execute(
+        "INSERT INTO articles (title_ar, title_en, content_ar, content_en, excerpt_ar, excerpt_en) "
+        "VALUES ('مقالة البحث', 'Search article', ?, 'A colourful mosaic', '', '')",
+        (TEXT_AR,)
+    )
+    conn.commit()
+    yield cursor.lastrowid
+    conn.execute("DELETE FROM articles WHERE id = ?", (cursor.lastrowid,))
+    conn.commit()
+    conn.close()
+
+def search(app, query):
+    return app.test_client().get('/search', query_string={'q': query}).get_data(as_text=True)
+
+def test_snippet_shows_original_text(app, article_id):
+    # Harakat and ة/ه are normalised for matching only
+    body = search(app, 'فسيفساء')
+    assert '<mark>فُسَيْفِسَاء</mark> ملوّنة' in body
+    assert 'لوحه' not in body
+
+def test_updated_and_deleted_articles_leave_the_index(app, article_id):
+    conn = sqlite3.connect(app.config['DATABASE'])
+    conn.execute("UPDATE articles SET content_ar = 'نقش بديل' WHERE id = ?", (article_id,))
+    conn.commit()
+    assert '<mark>' not in search(app, 'فسيفساء')
+    assert '<mark>بديل</mark>' in search(app, 'بديل')
+
+    conn.execute("DELETE FROM articles WHERE id = ?", (article_id,))
+    conn.commit()
+    assert '<mark>' not in search(app, 'بديل')
+    conn.close()
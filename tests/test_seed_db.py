@@ -0,0 +1,33 @@
+import os
+import sqlite3
+import subprocess
+import sys
+from conftest import ROOT
+
+SYNTHETIC_ROWS = """
+    SELECT r.id, r.user_id, r.report_type, r.title, r.description, r.status, r.created_at, r.updated_at
+    FROM reports r JOIN users u ON u.id = r.user_id WHERE u.email LIKE '%@load.test'
+    UNION ALL
+    SELECT q.id, q.user_id, q.quiz_id, q.score, q.answers, NULL, q.created_at, NULL
+    FROM user_quiz_results q JOIN users u ON u.id = q.user_id WHERE u.email LIKE '%@load.test'
+"""
+
+def seed_scaled(database, *args):
+    subprocess.run([sys.executable, os.path.join(ROOT, 'seed_db.py'), '--reset', '--scale',
+                    '--users', '20', '--reports', '200', '--attempts', '50', *args],
+                   cwd=ROOT, env=dict(os.environ, DATABASE=database), check=True, capture_output=True)
+    conn = sqlite3.connect(database)
+    try:
+        return conn.execute(SYNTHETIC_ROWS).fetchall()
+    finally:
+        conn.close()
+
+def test_same_seed_gives_the_same_synthetic_data(tmp_path):
+    first = seed_scaled(str(tmp_path / 'first.sqlite'), '--seed', '7')
+    second = seed_scaled(str(tmp_path / 'second.sqlite'), '--seed', '7')
+    assert len(first) == 250
+    assert first == second
+
+def test_synthetic_history_ends_on_the_end_date(tmp_path):
+    rows = seed_scaled(str(tmp_path / 'scaled.sqlite'), '--end-date', '2020-06-30')
+    assert max(row[6] for row in rows) < '2020-06-30 00:00:00'
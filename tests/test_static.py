@@ -0,0 +1,37 @@
+import os
+import sqlite3
+import pytest
+
+@pytest.fixture
+def legacy_upload(app):
+    """A report attachment stored under static/uploads before content-addressed storage."""
+    path = os.path.join(app.static_folder, 'uploads', 'legacy-test.pdf')
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(b'%PDF-1.4 legacy')
+    conn = sqlite3.connect(app.config['DATABASE'])
+    user_id = conn.execute("SELECT id FROM users WHERE email = 'ahmed@example.com'").fetchone()[0]
+    report_id = conn.execute(
+        "INSERT INTO reports (user_id, report_type, title, description, file_path, status) "
+        "VALUES (?, 'Other', 'Legacy', 'Legacy attachment', 'uploads/legacy-test.pdf', 'new')",
+        (user_id,)
+    ).lastrowid
+    conn.commit()
+    yield report_id
+    conn.execute("DELETE FROM reports WHERE id = ?", (report_id,))
+    conn.commit()
+    conn.close()
+    os.remove(path)
+
+@pytest.mark.parametrize('url', ['/static/uploads/legacy-test.pdf', '/static/css/../uploads/legacy-test.pdf',
+                                 '/en/static/uploads/legacy-test.pdf'])
+def test_uploads_are_not_served_as_static_files(app, legacy_upload, url):
+    assert app.test_client().get(url).status_code == 404
+
+def test_owner_downloads_legacy_upload_through_the_protected_route(app, legacy_upload, user_client):
+    response = user_client.get(f'/report/{legacy_upload}/attachment')
+    assert response.status_code == 200
+    assert response.data == b'%PDF-1.4 legacy'
+
+def test_assets_are_still_served(app):
+    assert app.test_client().get('/static/css/style.css').status_code == 200
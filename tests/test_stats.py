@@ -0,0 +1,27 @@
+import os
+import sqlite3
+import subprocess
+import sys
+from conftest import ROOT
+from stats import recount
+
+def triggers(database):
+    conn = sqlite3.connect(database)
+    try:
+        return conn.execute("SELECT name, sql FROM sqlite_master WHERE type = 'trigger' ORDER BY name").fetchall()
+    finally:
+        conn.close()
+
+def test_scaled_seed_keeps_the_migrated_counter_triggers(app, tmp_path):
+    database = str(tmp_path / 'scaled.sqlite')
+    subprocess.run([sys.executable, os.path.join(ROOT, 'seed_db.py'), '--reset', '--scale',
+                    '--users', '20', '--reports', '200', '--attempts', '20'],
+                   cwd=ROOT, env=dict(os.environ, DATABASE=database), check=True, capture_output=True)
+    assert triggers(database) == triggers(app.config['DATABASE'])
+
+    conn = sqlite3.connect(database)
+    conn.row_factory = sqlite3.Row
+    assert recount(conn) == {}
+    conn.execute("UPDATE reports SET status = 'closed' WHERE id = (SELECT MIN(id) FROM reports)")
+    assert recount(conn) == {}
+    conn.close()
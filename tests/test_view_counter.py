@@ -0,0 +1,44 @@
+import sqlite3
+import time
+from view_counter import ViewCounter
+
+def wait_for(predicate, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.02)
+    return False
+
+def make_database(path):
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE articles (id INTEGER PRIMARY KEY, views INTEGER NOT NULL DEFAULT 0)")
+    conn.execute("INSERT INTO articles (id) VALUES (1)")
+    conn.commit()
+    return conn
+
+def test_increment_does_not_wait_for_a_locked_database(tmp_path):
+    database = str(tmp_path / 'views.sqlite')
+    conn = make_database(database)
+    conn.execute("BEGIN EXCLUSIVE")
+
+    counter = ViewCounter(flush_interval=3600, flush_threshold=1, database=database)
+    start = time.monotonic()
+    for _ in range(5):
+        counter.increment(1)
+    assert time.monotonic() - start < 0.5
+
+    conn.rollback()
+    assert wait_for(lambda: counter.flush() >= 0 and counter.pending(1) == 0)
+    assert conn.execute("SELECT views FROM articles WHERE id = 1").fetchone()[0] == 5
+    conn.close()
+
+def test_threshold_wakes_the_background_flush(tmp_path):
+    database = str(tmp_path / 'views.sqlite')
+    conn = make_database(database)
+    counter = ViewCounter(flush_interval=3600, flush_threshold=3, database=database)
+    for _ in range(3):
+        counter.increment(1)
+    assert wait_for(lambda: conn.execute("SELECT views FROM articles WHERE id = 1").fetchone()[0] == 3)
+    assert counter.pending(1) == 0
+    conn.close()
@@ -0,0 +1,68 @@
+import sqlite3
+import pytest
+from metrics import Metrics, QueryStats
+from slow_queries import SlowQueryLog
+from view_counter import ViewCounter
+
+def test_failed_view_count_flush_is_retried(tmp_path):
+    database = str(tmp_path / 'views.sqlite')
+    counter = ViewCounter(flush_interval=3600, database=database)
+    counter.increment(1, 3)
+    with pytest.raises(sqlite3.OperationalError):
+        counter.flush()  # no articles table yet
+    assert counter.pending(1) == 3
+
+    conn = sqlite3.connect(database)
+    conn.execute("CREATE TABLE articles (id INTEGER PRIMARY KEY, views INTEGER NOT NULL DEFAULT 0)")
+    conn.execute("INSERT INTO articles (id) VALUES (1)")
+    conn.commit()
+    counter.increment(1)
+    assert counter.flush() == 1
+    assert conn.execute("SELECT views FROM articles WHERE id = 1").fetchone()[0] == 4
+    assert counter.flush() == 0
+    conn.close()
+
+def test_failed_metrics_flush_is_retried(tmp_path):
+    database = str(tmp_path / 'metrics.sqlite')
+    metrics = Metrics(flush_interval=3600, database=database)
+    stats = QueryStats()
+    stats.record('SELECT 1', 0.5)
+    metrics.observe_request('index', 'GET', 200, 0.75, stats)
+    with pytest.raises(sqlite3.OperationalError):
+        metrics.flush()  # no metrics tables yet
+
+    conn = sqlite3.connect(database)
+    conn.executescript("""
+        CREATE TABLE metrics (name TEXT NOT NULL, labels TEXT NOT NULL, value REAL NOT NULL,
+                              PRIMARY KEY (name, labels));
+        CREATE TABLE metrics_slowest_statements (endpoint TEXT PRIMARY KEY, seconds REAL NOT NULL,
+                                                 statement TEXT NOT NULL);
+    """)
+    metrics.observe_request('index', 'GET', 200, 0.25, None)
+    assert metrics.flush() > 0
+    assert conn.execute("SELECT value FROM metrics WHERE name = 'http_requests_total'").fetchone()[0] == 2
+    assert conn.execute("SELECT seconds, statement FROM metrics_slowest_statements").fetchone() == (0.5, 'SELECT 1')
+    conn.close()
+
+def test_failed_slow_query_flush_is_retried(tmp_path):
+    database = str(tmp_path / 'slow.sqlite')
+    conn = sqlite3.connect(database)
+    log = SlowQueryLog(threshold_ms=10, flush_interval=3600, database=database)
+    log.observe(conn, 'SELECT 1 WHERE ? > 0', (5,), 0.02)
+    with pytest.raises(sqlite3.OperationalError):
+        log.flush()  # no slow_queries table yet
+
+    conn.execute("""
+        CREATE TABLE slow_queries (
+            fingerprint TEXT PRIMARY KEY, sql TEXT NOT NULL, plan TEXT NOT NULL, full_scan INTEGER NOT NULL,
+            params_shape TEXT, endpoint TEXT, calls INTEGER NOT NULL, total_seconds REAL NOT NULL,
+            max_seconds REAL NOT NULL, last_seen TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    conn.commit()
+    log.observe(conn, 'SELECT 1 WHERE ? > 0', (7,), 0.03)
+    log.observe(conn, 'SELECT 1 WHERE ? > 0', (9,), 0.001)  # under the threshold
+    assert log.flush() == 1
+    row = conn.execute("SELECT calls, total_seconds, max_seconds, params_shape FROM slow_queries").fetchone()
+    assert row[0] == 2 and row[1] == pytest.approx(0.05) and row[2] == 0.03 and row[3] == '(int)'
+    conn.close()
@@ -0,0 +1,82 @@
+"""
+Per-worker in-memory buffers that are written to the database in batches.
+
+Request threads only update the buffer under a lock; a daemon thread
+started on first use flushes it in one transaction every `flush_interval`
+seconds (sooner when a subclass calls _flush_soon()), and the buffer is
+flushed once more when the worker exits. If a flush fails, the batch is
+merged back into the buffer so the next flush retries it.
+
+Subclasses keep their pending data under self._lock and implement:
+
+    _take()              swap out the pending data and return it, or None if empty
+    _write(conn, batch)  write a batch inside a transaction, return the rows written
+    _restore(batch)      merge a batch that failed to write back into the buffer
+"""
+
+import atexit
+import logging
+import threading
+from models import connect
+
+logger = logging.getLogger(__name__)
+
+class WriteBehindBuffer:
+    thread_name = 'write-behind-flush'
+    description = 'buffered writes'  # for the flush failure log message
+
+    def __init__(self, flush_interval, database=None):
+        self.flush_interval = flush_interval
+        self.database = database
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._flush_due = threading.Event()
+        self._timer = None
+        atexit.register(self.flush)
+
+    def flush(self):
+        """Write the buffered data in one transaction. Returns the number of rows written."""
+        with self._flush_lock:
+            with self._lock:
+                batch = self._take()
+            if not batch:
+                return 0
+            conn = connect(self.database)
+            try:
+                with conn:
+                    return self._write(conn, batch)
+            except Exception:
+                with self._lock:
+                    self._restore(batch)
+                raise
+            finally:
+                conn.close()
+
+    def _take(self):
+        raise NotImplementedError
+
+    def _write(self, conn, batch):
+        raise NotImplementedError
+
+    def _restore(self, batch):
+        raise NotImplementedError
+
+    def _flush_soon(self):
+        """Wake the flusher; the write lock is never taken on the request path."""
+        self._flush_due.set()
+
+    def _ensure_timer(self):
+        # Background flush so an idle worker does not sit on buffered data
+        if self._timer is not None and self._timer.is_alive():
+            return
+        self._timer = threading.Thread(target=self._run_timer, name=self.thread_name, daemon=True)
+        self._timer.start()
+
+    def _run_timer(self):
+        while True:
+            self._flush_due.wait(self.flush_interval)
+            self._flush_due.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Failed to flush %s", self.description)